@@ -1 +1,10 @@
-from .cholensky import compute, is_correct_solution
\ No newline at end of file
+from .cholensky import compute, compute_batched, check_requirements, is_correct_solution
+from .scheduler import compute_dag, dag_report
+from .packed import pack, unpack, packed_size, packed_index, packed_order, packed_row
+from .out_of_core import compute_out_of_core, open_matrix
+from .errors import NotPositiveDefiniteError
+from .update import update, downdate, grow, shrink
+from .banded import compute_banded, to_band, from_band
+from .sparse import analyze, compute_sparse
+from .storage import save_matrix, load_matrix, save_system, load_system, save_factor, load_factor, factor_info
+from .pivoted import compute_ldlt, compute_pivoted
\ No newline at end of file
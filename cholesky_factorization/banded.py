@@ -0,0 +1,89 @@
+from .errors import NotPositiveDefiniteError
+from numba import njit
+import numpy as np
+import logging
+
+
+# Band storage of a symmetric matrix with (lower) bandwidth w:
+# only the diagonal and the w sub-diagonals are kept, column by column,
+# in a (n, w+1) array
+#
+#       B[j, d] = A[j+d, j]         0 <= d <= w
+#
+# so the band of column j is contiguous in memory.
+# The factor L has the same bandwidth and is returned in the same storage.
+
+
+def to_band(A: np.ndarray, w: int) -> np.ndarray:
+    '''
+        Extract the band of width w of the (dense) matrix A.
+    '''
+    n, _ = A.shape
+
+    B = np.zeros((n, w + 1), dtype=np.float64)
+    for d in range(min(w, n - 1) + 1):
+        B[:n-d, d] = np.diagonal(A, -d)
+
+    return B
+
+
+def from_band(B: np.ndarray) -> np.ndarray:
+    '''
+        Rebuild the dense lower triangular matrix stored in B.
+    '''
+    n, width = B.shape
+
+    L = np.zeros((n, n), dtype=B.dtype)
+    for d in range(min(width, n)):
+        idx = np.arange(n - d)
+        L[idx + d, idx] = B[:n-d, d]
+
+    return L
+
+
+def compute_banded(B: np.ndarray, overwrite=False) -> np.ndarray:
+    '''
+        Cholesky factorization of a banded matrix given in band storage.
+        Only the band is stored and touched: O(n w^2) time and O(n w) memory.
+
+        The requirements are not checked in advance, a non positive
+        pivot raises NotPositiveDefiniteError.
+    '''
+    if not overwrite or B.dtype != np.float64:
+        B = np.array(B, dtype=np.float64)
+
+    n, width = B.shape
+    logging.info(f"Computing Banded Cholesky Factorization {n}x{n}, bandwidth {width - 1}")
+
+    pivot = __banded_kernel(B)
+
+    if pivot >= 0:
+        raise NotPositiveDefiniteError(pivot)
+
+    return B
+
+
+@njit(cache=True)
+def __banded_kernel(B: np.ndarray) -> int:
+    n, width = B.shape
+    w = width - 1
+
+    for j in range(n):
+        if not B[j, 0] > 0.0:
+            return j
+
+        d = np.sqrt(B[j, 0])
+        B[j, 0] = d
+
+        m = min(w, n - 1 - j)
+        for i in range(1, m + 1):
+            B[j, i] /= d
+
+        # update the columns j+1 ... j+m that are reached by column j:
+        # A[j+k, j+i] -= L[j+k, j] L[j+i, j]
+        for i in range(1, m + 1):
+            l = B[j, i]
+            for k in range(i, m + 1):
+                B[j + i, k - i] -= B[j, k] * l
+
+    return -1
@@ -1,21 +1,64 @@
-from numba import jit
+from concurrent.futures import ThreadPoolExecutor
+from numba import njit, prange
+from .scheduler import compute_dag
+from .errors import NotPositiveDefiniteError
+from .packed import pack, unpack
+from .out_of_core import compute_out_of_core, open_matrix, DEFAULT_MEMORY_BUDGET
+from .triangular import invert_lower
+import numba
 import numpy as np
-from tqdm import tqdm
+from telemetry import progress, phase
 import logging
 
 
-def compute(A: np.ndarray, method="column", jit=False, nocontrols=False) -> np.ndarray:
+def compute(A: np.ndarray, method="column", jit=False, nocontrols=False, block_size=256,
+            fastmath=False, boundscheck=False, parallel=False, n_workers=None,
+            overwrite_a=False, packed=False, out=None, memory_budget=DEFAULT_MEMORY_BUDGET,
+            validation="eigenvalues", dtype=np.float64) -> np.ndarray:
     '''
         Apply Cholesky's factoring to obtain the L matrix.
         In order to have a correct computation, the conditions imposed by the
         previous functions have to be respected.
 
-        jit: if True, optimize the execution of this function with numba.
+        jit:            if True, optimize the execution of this function with numba.
+        block_size:     size of the tiles used by the "blocked" and "dag" methods.
+        fastmath:       (jit only) let numba reorder the floating point operations.
+        boundscheck:    (jit only) check the indexes inside the compiled kernels.
+        parallel:       compute the independent elements of each step in parallel
+                        (jit kernels and "blocked" method).
+        n_workers:      number of threads used when parallel is True and 
+                        by the "dag" method (None means all the available cores).
+        overwrite_a:    write L in the lower triangle of A (the upper one is set to 0)
+                        instead of allocating a new matrix. A must be a floating point array
+                        (of the requested dtype, otherwise A is converted to a new matrix).
+        packed:         return L in packed storage (see packed.pack).
+        out:            ("out_of_core" only) array or .npy path where L is written.
+        memory_budget:  ("out_of_core" only) bytes of RAM used for the panels.
+        validation:     how the requirements are checked (if nocontrols is False):
+                        - eigenvalues:  symmetry and eigenvalues of A, before the factorization.
+                        - fast:         symmetry checked block by block, and positive
+                                        definiteness checked on the pivots during the 
+                                        factorization, that stops at the first non positive one
+                                        (with overwrite_a, A is left partially factored).
+        dtype:          precision of the factorization (np.float64 or np.float32).
+
+        A can also be the path of a .npy/raw file, that is memory-mapped.
     '''
+    if isinstance(A, str):
+        A = open_matrix(A)
+
     # if specified, the initial checks are skipped to save time
     if nocontrols: 
         logging.info("Skipping Requirements")
         is_factorizable = True
+
+    elif validation == "fast":
+        is_factorizable = __check_requirements(A, fast=True, block_size=block_size)
+
+    elif method == "out_of_core":
+        # the checks would need the whole matrix in memory
+        logging.info("Skipping Requirements (out of core)")
+        is_factorizable = True
     
     else:
         is_factorizable = __check_requirements(A)
@@ -24,23 +67,91 @@ def compute(A: np.ndarray, method="column", jit=False, nocontrols=False) -> np.n
     if not is_factorizable:
         return None
 
-    logging.info(f"Computing Cholesky Factorization {method} - jit: {jit}")
-    L = methods[method](A, jit) # avvia la relativa implementazione
+    dtype = np.dtype(dtype)
+
+    # the out of core method converts the panels when they are read
+    if method != "out_of_core" and A.dtype != dtype:
+        logging.info(f"Converting A to {dtype}")
+        A = A.astype(dtype)
+
+    logging.info(f"Computing Cholesky Factorization {method} - jit: {jit} - dtype: {dtype}")
+
+    if parallel and not jit and method not in ("blocked", "dag"):
+        logging.warning("parallel is only used by the JIT kernels and by the blocked method")
+
+    try:
+        with phase(f"Cholesky Factorization - {method}{' (JIT)' if jit else ''}"):
+            L = methods[method](
+                    A, jit, 
+                    block_size=block_size, 
+                    fastmath=fastmath, 
+                    boundscheck=boundscheck,
+                    parallel=parallel,
+                    n_workers=n_workers,
+                    overwrite_a=overwrite_a,
+                    out=out,
+                    memory_budget=memory_budget,
+                    check_pivots=validation == "fast" and not nocontrols,
+                    dtype=dtype
+                ) # avvia la relativa implementazione
+
+    except NotPositiveDefiniteError as e:
+        logging.error(f"Cholesky Factorization stopped: {e}")
+        return None
+
+    if packed:
+        return pack(L)
 
     return L
 
 
+def compute_batched(As: np.ndarray, fastmath=False, parallel=True) -> np.ndarray:
+    '''
+        Apply Cholesky's factoring to a stack of (small) matrices 
+        As with shape (batch, n, n), returning the stack of the L matrices.
+
+        All the matrices are factored by a single compiled kernel
+        (in parallel over the batch if parallel is True), so the overhead
+        of compute() is paid once for the whole stack.
+        
+        N.B. the requirements are not checked: the factors of the matrices
+        that are not positive definite contain NaN.
+    '''
+    As = np.asarray(As, dtype=np.float64)
+    Ls = np.zeros(As.shape, dtype=np.float64)
+
+    logging.info(f"Computing Cholesky Factorization of {As.shape[0]} matrices {As.shape[1]}x{As.shape[2]}")
+    __compile(__batched_kernel, fastmath=fastmath, parallel=parallel)(As, Ls)
+
+    return Ls
+
+
 def is_correct_solution(A: np.ndarray, L: np.ndarray) -> bool:
 		'''
             Check that the solution is correct by recalculating A from L
 		'''
+		if L.ndim == 1:
+			L = unpack(L)	# packed storage
+
 		A_bis = np.dot(L, np.transpose(L))
         # print(A_bis)
 
 		return np.allclose(A, A_bis, 0.001, 0.001)
 
 
-def __check_requirements(A: np.ndarray) -> bool:
+def check_requirements(A: np.ndarray, validation="eigenvalues", block_size=256) -> bool:
+    '''
+        Check that A can be factored (the same checks of compute), without factoring it.
+    '''
+    return __check_requirements(A, fast=validation == "fast", block_size=block_size)
+
+
+def __check_requirements(A: np.ndarray, fast=False, block_size=256) -> bool:
+    '''
+        Check that A can be factored. With fast=True only the symmetry
+        is checked (block by block), positive definiteness is checked
+        on the pivots during the factorization.
+    '''
 
     def is_square(matrix: np.ndarray) -> bool:
         '''
@@ -71,6 +182,22 @@ def __check_requirements(A: np.ndarray) -> bool:
         
         return False
 
+    def is_symmetric_blockwise(matrix: np.ndarray) -> bool:
+        '''
+            Same as is_symmetric, comparing a block of the lower triangle 
+            with the transpose of the corresponding block of the upper one, 
+            so the temporaries are only block_size x block_size.
+        '''
+        logging.info("Checking IS SYMMETRIC (blockwise)")
+        n, _ = matrix.shape
+
+        for i in range(0, n, block_size):
+            for j in range(0, i + 1, block_size):
+                if not np.allclose(matrix[i:i+block_size, j:j+block_size], matrix[j:j+block_size, i:i+block_size].T):
+                    return False
+
+        return True
+
     def is_positive_definite(matrix: np.ndarray) -> bool:
         '''
             This function checks that the matrix is Definite Positive:
@@ -89,143 +216,335 @@ def __check_requirements(A: np.ndarray) -> bool:
 
     logging.info("Checking Cholesky Requirements")
     
+    if fast:
+        return is_square(A) and is_symmetric_blockwise(A)
+
     # check if all the requirements are met
     return is_square(A) and is_symmetric(A) and is_positive_definite(A)
 
 
 # --- JIT COMPILED FUNCTIONS --- #
 
-# Note: it seems that the functions that are subject to the JIT cannot fit 
-# inside the function that does the factoring since this makes the execution 
-# performance worse (on my pc by 1000 ms).
+# Note: calling a small jitted function for every element of L leaves the
+# double loop in Python and the dispatch overhead dominates the execution
+# (on my pc by 1000 ms). For this reason each method has a kernel where the
+# whole loop nest runs in nopython mode: the functions below are plain python
+# and are compiled on demand by __compile.
+#
+# The kernels return the index of the first pivot that is not positive
+# (if check is True) or -1.
 #
-# TODO: controllare che effettivamente è vero e il perchè.
-# TODO: nelle seguenti funzioni compilate abbiamo una roba del tipo
+# TODO: nelle seguenti funzioni abbiamo una roba del tipo
 #       L[i, j] = ...
 #       Sta cosa funziona perchè L è passato per riferimento, ma ci piace come cosa ?
 
+__kernels = {}
+
+
+def __compile(kernel, fastmath=False, boundscheck=False, parallel=False):
+    '''
+        Return the numba version of the given kernel, compiled with the given
+        options. The compiled code is persisted on disk (cache=True) only for
+        the default options, since the numba cache index does not take
+        fastmath/boundscheck into account and the variants would overwrite
+        each other.
+    '''
+    key = (kernel.__name__, fastmath, boundscheck, parallel)
+
+    if key not in __kernels:
+        __kernels[key] = njit(
+                cache=not (fastmath or boundscheck), 
+                fastmath=fastmath, 
+                boundscheck=boundscheck,
+                parallel=parallel
+            )(kernel)
+
+    return __kernels[key]
+
+
 ## ~~ by COLUMN
-@jit(nopython=True)
-def __column_columns_numba(L: np.array,A: np.array,i: int,j: int) -> bool:
-    L[i,j] = np.sqrt(A[i,j]-np.sum(L[i,:j]**2))
+def __column_kernel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
+
+    for j in range(n):
+        # calculate the values of the diagonal
+        s = A[j,j]
+        for k in range(j):
+            s -= L[j,k] * L[j,k]
+        if check and not s > 0.0:
+            return j
+        L[j,j] = np.sqrt(s)
+
+        # calculate the column values
+        for i in range(j+1, n):
+            s = A[i,j]
+            for k in range(j):
+                s -= L[i,k] * L[j,k]
+            L[i,j] = s / L[j,j]
+
+    return -1
+
+
+def __column_kernel_parallel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
 
-@jit(nopython=True)
-def __row_columns_numba(L: np.array,A: np.array,i: int,j: int) -> bool:
-    L[i,j] = (A[i,j]-np.sum(L[i,:j]*L[j,:j])) / L[j,j]
+    for j in range(n):
+        s = A[j,j]
+        for k in range(j):
+            s -= L[j,k] * L[j,k]
+        if check and not s > 0.0:
+            return j
+        L[j,j] = np.sqrt(s)
+
+        # each L[i,j] only depends on the columns already computed
+        for i in prange(j+1, n):
+            s = A[i,j]
+            for k in range(j):
+                s -= L[i,k] * L[j,k]
+            L[i,j] = s / L[j,j]
+
+    return -1
 
 
 ## ~~ by ROW
-# Calculate the factorization of the elements along the diagonal of A
-@jit(nopython=True)
-def __row_diagonal(L:np.ndarray, A:np.ndarray, i:int, j:int) -> bool:
-    L[i,j] = np.sqrt(A[i,j]-np.sum(L[:i,j]**2))
+def __row_kernel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
+
+    for i in range(n):
+        # calculate the values of the diagonal
+        s = A[i,i]
+        for k in range(i):
+            s -= L[k,i] * L[k,i]
+        if check and not s > 0.0:
+            return i
+        L[i,i] = np.sqrt(s)
+
+        # calculate the row values (of the transposed matrix)
+        for j in range(i+1, n):
+            s = A[i,j]
+            for k in range(i):
+                s -= L[k,i] * L[k,j]
+            L[i,j] = s / L[i,i]
+
+    return -1
+
 
-# Calculate the factorization of elements that are not on the diagonal of A
-@jit(nopython=True)
-def __row_non_diagonal(L:np.ndarray, A:np.ndarray, i:int, j:int) -> bool:
-    L[i,j] = (A[i,j]-np.sum(L[:i,j]*L[:i,i])) / L[i,i]
+def __row_kernel_parallel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
+
+    for i in range(n):
+        s = A[i,i]
+        for k in range(i):
+            s -= L[k,i] * L[k,i]
+        if check and not s > 0.0:
+            return i
+        L[i,i] = np.sqrt(s)
+
+        # each L[i,j] only depends on the rows already computed
+        for j in prange(i+1, n):
+            s = A[i,j]
+            for k in range(i):
+                s -= L[k,i] * L[k,j]
+            L[i,j] = s / L[i,i]
+
+    return -1
 
 
 ## ~~ by DIAGONAL
-@jit(nopython=True)
-def __cholesky_formula_diagonal(i, j, A, L):
-        if (i == j):
-            return np.sqrt(A[i,j]-np.sum(L[i,:j]**2))   # calculate the values of the diagonal
+def __diagonal_kernel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
+
+    # the elements of the d-th anti-diagonal satisfy i + j = d
+    for d in range(2 * n - 1):
+        for j in range(max(0, d - n + 1), d // 2 + 1):
+            i = d - j
+
+            s = A[i,j]
+            for k in range(j):
+                s -= L[i,k] * L[j,k]
+
+            if (i == j):
+                if check and not s > 0.0:
+                    return i
+                L[i,j] = np.sqrt(s)     # calculate the values of the diagonal
+            else:
+                L[i,j] = s / L[j,j]     # calculate the column values
+
+    return -1
+
+
+def __diagonal_kernel_parallel(A: np.ndarray, L: np.ndarray, check=False) -> int:
+    n = A.shape[0]
+
+    # the elements of the same anti-diagonal only depend on 
+    # the previous anti-diagonals (wavefront)
+    for d in range(2 * n - 1):
+        for j in prange(max(0, d - n + 1), d // 2 + 1):
+            i = d - j
+
+            s = A[i,j]
+            for k in range(j):
+                s -= L[i,k] * L[j,k]
+
+            if (i == j):
+                L[i,j] = np.sqrt(s)
+            else:
+                L[i,j] = s / L[j,j]
+
+        # the pivot cannot stop the parallel loop, it is checked after it
+        if check and d % 2 == 0 and not L[d // 2, d // 2] > 0.0:
+            return d // 2
+
+    return -1
+
+
+## ~~ BATCHED
+def __batched_kernel(As: np.ndarray, Ls: np.ndarray):
+    n = As.shape[1]
+
+    # every matrix is factored by column, the matrices are independent
+    for b in prange(As.shape[0]):
+        A = As[b]
+        L = Ls[b]
+
+        for j in range(n):
+            s = A[j,j]
+            for k in range(j):
+                s -= L[j,k] * L[j,k]
+            L[j,j] = np.sqrt(s)
+
+            for i in range(j+1, n):
+                s = A[i,j]
+                for k in range(j):
+                    s -= L[i,k] * L[j,k]
+                L[i,j] = s / L[j,j]
+
+
+__parallel_kernels = {
+    __column_kernel: __column_kernel_parallel, 
+    __row_kernel: __row_kernel_parallel, 
+    __diagonal_kernel: __diagonal_kernel_parallel
+    }
+
+
+def __run_kernel(kernel, A: np.ndarray, L: np.ndarray, options: dict):
+    '''
+        Compile (if needed) and execute the kernel on A and L.
+        If requested, the parallel version of the kernel is used
+        with the given number of threads.
+    '''
+    parallel = options.get("parallel", False) and kernel in __parallel_kernels
+    check = options.get("check_pivots", False)
+
+    if not parallel:
+        pivot = __compile(kernel, **__jit_options(options))(A, L, check)
+    
+    else:
+        compiled = __compile(__parallel_kernels[kernel], parallel=True, **__jit_options(options))
+        n_workers = options.get("n_workers")
+
+        if n_workers is None:
+            pivot = compiled(A, L, check)
         
-        return (A[i,j]-np.sum(L[i,:j]*L[j,:j])) / L[j,j]    # calculate the column values
+        else:
+            previous = numba.get_num_threads()
+            numba.set_num_threads(min(n_workers, numba.config.NUMBA_NUM_THREADS))
+            try:
+                pivot = compiled(A, L, check)
+            finally:
+                numba.set_num_threads(previous)
+
+    if pivot >= 0:
+        raise NotPositiveDefiniteError(pivot)
 
 
 # --- CHOLESKY METHODS --- #
 
-def __compute_by_column(A: np.ndarray, jit=False) -> np.ndarray:
+def __compute_by_column(A: np.ndarray, jit=False, **options) -> np.ndarray:
     n, _ = A.shape
 
-    L = np.zeros(n*n, dtype=float).reshape(n, n)    # initialize the result matrix
+    # initialize the result matrix
+    L = A if __in_place(A, options) else np.zeros(n*n, dtype=A.dtype).reshape(n, n)
 
     # this if is ugly but maybe it is necessary. 
     # It could be put inside the for but in this way 
     # i would go to perform a check many times that must be performed only once (at the beginning).
     if jit:
-        for j in tqdm(range(n), "Cholesky - COLUMN (JIT)"):
-            for i in range(j, n):
-                if (i == j):
-                    __column_columns_numba(L,A,i,j)   # calculate the values of the diagonal
-                else:
-                    __row_columns_numba(L,A,i,j)   # calculate the column values
+        logging.info("Cholesky - COLUMN (JIT)")
+        __run_kernel(__column_kernel, A, L, options)
     
     else:
-        for j in tqdm(range(n), "Cholesky - COLUMN"):
+        for j in progress(range(n), "Cholesky - COLUMN"):
             for i in range(j, n):
                 if (i == j):
-                    L[i,j] = np.sqrt(A[i,j]-np.sum(L[i,:j]**2))   # calculate the values of the diagonal
+                    pivot = A[i,j]-np.sum(L[i,:j]**2)
+                    __check_pivot(pivot, j, options)
+                    L[i,j] = np.sqrt(pivot)   # calculate the values of the diagonal
                 else:
                     L[i,j] = (A[i,j]-np.sum(L[i,:j]*L[j,:j])) / L[j,j]   # calculate the column values
 
+    if L is A:
+        __clear_upper(L)
+
     return L
 
 
-def __compute_by_row(A: np.ndarray, jit=False) -> np.ndarray:
+def __compute_by_row(A: np.ndarray, jit=False, **options) -> np.ndarray:
     n, _ = A.shape
 
-    L = np.zeros(n*n, dtype=float).reshape(n, n)  # initialize the result matrix
+    # initialize the result matrix 
+    # (in place the transpose of L is written in the upper triangle of A.T)
+    in_place = __in_place(A, options)
+    L = A.transpose() if in_place else np.zeros(n*n, dtype=A.dtype).reshape(n, n)
+    A = A.transpose() if in_place else A
 
     if jit:
-        for i in tqdm(range(n), "Cholesky - ROW (JIT)"):
-            for j in range(i, n):
-                if (i == j):
-                    __row_diagonal(L,A,i,j)   # calculate the values of the diagonal
-                else:
-                    __row_non_diagonal(L,A,i,j)  # calculate the column values
+        logging.info("Cholesky - ROW (JIT)")
+        __run_kernel(__row_kernel, A, L, options)
 
     else:
-        for i in tqdm(range(n), "Cholesky - ROW"):
+        for i in progress(range(n), "Cholesky - ROW"):
             for j in range(i, n):
                 if (i == j):
-                    L[i,j] = np.sqrt(A[i,j]-np.sum(L[:i,j]**2))   # calculate the values of the diagonal
+                    pivot = A[i,j]-np.sum(L[:i,j]**2)
+                    __check_pivot(pivot, i, options)
+                    L[i,j] = np.sqrt(pivot)   # calculate the values of the diagonal
                 else:
                     L[i,j] = (A[i,j]-np.sum(L[:i,j]*L[:i,i])) / L[i,i]   # calculate the column values
 
+    if in_place:
+        __clear_upper(L.transpose())
+
     # N.B. the matrix must be transposed !!
     return L.transpose()
 
 
-def __compute_by_diagonal(A: np.ndarray, jit=False) -> np.ndarray:
+def __compute_by_diagonal(A: np.ndarray, jit=False, **options) -> np.ndarray:
     # TODO: is what works but could be improved (From an aesthetic point of view)!
 
     def cholesky_formula(i, j, A, L):
         if (i == j):
-            return np.sqrt(A[i,j]-np.sum(L[i,:j]**2))   # calculate the values of the diagonal
+            pivot = A[i,j]-np.sum(L[i,:j]**2)
+            __check_pivot(pivot, i, options)
+            return np.sqrt(pivot)   # calculate the values of the diagonal
         
         return (A[i,j]-np.sum(L[i,:j]*L[j,:j])) / L[j,j]    # calculate the column values
 
 
     n, _ = A.shape
 
-    L = np.zeros(n*n, dtype=float).reshape(n, n)    # initialize the result matrix
+    # initialize the result matrix
+    L = A if __in_place(A, options) else np.zeros(n*n, dtype=A.dtype).reshape(n, n)
 
     external = 0 #variable to count how many external loops I have to do
     internal = 2 * n - 1 - 1
     aux = 0
     if jit:
-        for row in tqdm(range(2 * n - 1), "Cholesky - DIAGONAL (JIT)"):
-            if row < n-1:
-                col = 0
-                L[row, col] = __cholesky_formula_diagonal(row, col, A, L)
-                aux += 1
-                for z in range(1, int(np.floor(row/2))+1):
-                    L[row-z, col+z] = __cholesky_formula_diagonal(row-z, col+z, A, L)
-
-            else:
-                col = n-1
-                L[col, row-aux] = __cholesky_formula_diagonal(col, row-aux, A, L)
-                for z in range(1, int(np.floor(internal/2))+1):
-                    L[col-z, row-aux+z] = __cholesky_formula_diagonal(col-z, row-aux+z, A, L)
-
-            internal -= 1   
-            external += 1
+        logging.info("Cholesky - DIAGONAL (JIT)")
+        __run_kernel(__diagonal_kernel, A, L, options)
     
     else:
-        for row in tqdm(range(2 * n - 1), "Cholesky - DIAGONAL"):
+        for row in progress(range(2 * n - 1), "Cholesky - DIAGONAL"):
             if row < n-1:
                 col = 0
                 L[row, col] = cholesky_formula(row, col, A, L)
@@ -241,8 +560,180 @@ def __compute_by_diagonal(A: np.ndarray, jit=False) -> np.ndarray:
 
             internal -= 1   
             external += 1
+
+    if L is A:
+        __clear_upper(L)
         
     return L
 
 
-methods = {"row": __compute_by_row, "column": __compute_by_column, "diagonal": __compute_by_diagonal}
+def __compute_blocked(A: np.ndarray, jit=False, block_size=256, **options) -> np.ndarray:
+    '''
+        Right-looking blocked (tiled) factorization.
+
+        For every block column k:
+            1. factor the diagonal tile         L_kk = chol(A_kk)
+            2. solve the panel below it         L_ik = A_ik L_kk^-T
+            3. update the trailing matrix       A_ij = A_ij - L_ik L_jk^T
+
+        Only the diagonal tile is factored element by element, everything else
+        is done with matrix-matrix products, so nearly all the flops run in BLAS.
+    '''
+    n, _ = A.shape
+
+    # the factorization overwrites A or a copy of it
+    L = A if __in_place(A, options) else np.array(A)
+
+    def solve_panel(inverse, k, end, i):
+        # panel: L_ik L_kk^T = A_ik  ->  L_ik = A_ik L_kk^-T
+        i_end = min(i + block_size, n)
+        L[i:i_end, k:end] = L[i:i_end, k:end] @ inverse.T
+
+    def update_trailing(k, end, j):
+        # only the tiles on and below the diagonal are touched
+        j_end = min(j + block_size, n)
+        L[j:, j:j_end] -= L[j:, k:end] @ L[j:j_end, k:end].T
+
+    # the tiles of the panel and the block columns of the trailing matrix
+    # are independent of each other, so they can be given to a thread pool 
+    # (numpy releases the GIL inside the BLAS calls)
+    pool = ThreadPoolExecutor(max_workers=options.get("n_workers")) if options.get("parallel") else None
+
+    try:
+        for k in progress(range(0, n, block_size), "Cholesky - BLOCKED"):
+            end = min(k + block_size, n)
+
+            try:
+                L[k:end, k:end] = __factor_tile(L[k:end, k:end], jit, options)
+            except NotPositiveDefiniteError as e:
+                raise NotPositiveDefiniteError(k + e.pivot)
+
+            L[k:end, end:] = 0.0    # the upper triangle of L is zero
+
+            if end == n:
+                break
+
+            inverse = invert_lower(L[k:end, k:end])    # once for all the tiles of the panel
+            __map(pool, lambda i: solve_panel(inverse, k, end, i), range(end, n, block_size))
+            __map(pool, lambda j: update_trailing(k, end, j), range(end, n, block_size))
+
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return L
+
+
+def __compute_by_dag(A: np.ndarray, jit=False, block_size=256, **options) -> np.ndarray:
+    '''
+        Tiled factorization where the tasks on the tiles are executed by 
+        the scheduler as soon as their dependencies are satisfied 
+        (see scheduler.compute_dag to also get the timings of the tasks).
+    '''
+    L, _ = compute_dag(
+            A, 
+            block_size=block_size, 
+            n_workers=options.get("n_workers"), 
+            potrf=lambda T: __factor_tile(T, jit, options),
+            overwrite_a=__in_place(A, options)
+        )
+
+    return L
+
+
+def __compute_out_of_core(A: np.ndarray, jit=False, block_size=256, **options) -> np.ndarray:
+    '''
+        Left-looking factorization over memory-mapped matrices
+        (see out_of_core.compute_out_of_core to also get the I/O statistics).
+    '''
+    L, _ = compute_out_of_core(
+            A, 
+            out=options.get("out"), 
+            block_size=block_size, 
+            memory_budget=options.get("memory_budget", DEFAULT_MEMORY_BUDGET), 
+            potrf=lambda T: __factor_tile(T, jit, options),
+            dtype=options.get("dtype", np.float64)
+        )
+
+    return L
+
+
+def __map(pool: ThreadPoolExecutor, function, iterable):
+    '''
+        Apply the function to every element, using the pool if given.
+    '''
+    if pool is None:
+        for item in iterable:
+            function(item)
+    else:
+        # list() waits for all the tasks and raises their exceptions
+        list(pool.map(function, iterable))
+
+
+def __factor_tile(T: np.ndarray, jit=False, options={}) -> np.ndarray:
+    '''
+        Unblocked outer-product factorization of a (small) diagonal tile.
+        Returns a new lower triangular tile.
+    '''
+    if jit:
+        L = np.zeros_like(T)
+        pivot = __compile(__column_kernel, **__jit_options(options))(T, L, options.get("check_pivots", False))
+        if pivot >= 0:
+            raise NotPositiveDefiniteError(pivot)
+        return L
+
+    T = np.array(T)
+    m, _ = T.shape
+
+    for j in range(m):
+        __check_pivot(T[j,j], j, options)
+        T[j,j] = np.sqrt(T[j,j])
+        T[j+1:, j] /= T[j,j]
+        T[j+1:, j+1:] -= np.outer(T[j+1:, j], T[j+1:, j])
+
+    return np.tril(T)
+
+
+def __in_place(A: np.ndarray, options: dict) -> bool:
+    '''
+        True if the factorization has to be written directly in A.
+    '''
+    if not options.get("overwrite_a", False):
+        return False
+
+    if A.dtype not in (np.float32, np.float64) or not A.flags.writeable:
+        logging.warning("overwrite_a needs a writeable floating point matrix, using a copy")
+        return False
+
+    return True
+
+
+def __check_pivot(pivot: float, index: int, options: dict):
+    '''
+        Stop the factorization if the pivot is not positive (when requested).
+    '''
+    if options.get("check_pivots", False) and not pivot > 0.0:
+        raise NotPositiveDefiniteError(index)
+
+
+def __clear_upper(L: np.ndarray):
+    '''
+        Set to 0 the elements above the diagonal (row by row, without temporaries).
+    '''
+    n, _ = L.shape
+
+    for i in range(n):
+        L[i, i+1:] = 0.0
+
+
+def __jit_options(options: dict) -> dict:
+    '''
+        Extract the numba options from the ones given to the methods.
+    '''
+    return {
+        "fastmath": options.get("fastmath", False), 
+        "boundscheck": options.get("boundscheck", False)
+        }
+
+
+methods = {"row": __compute_by_row, "column": __compute_by_column, "diagonal": __compute_by_diagonal, "blocked": __compute_blocked, "dag": __compute_by_dag, "out_of_core": __compute_out_of_core}
@@ -0,0 +1,9 @@
+class NotPositiveDefiniteError(Exception):
+    '''
+        Raised during the factorization when a pivot (the value under the 
+        square root) is not positive: the matrix is not positive definite.
+    '''
+
+    def __init__(self, pivot: int):
+        super().__init__(f"The matrix is not positive definite (pivot {pivot})")
+        self.pivot = pivot
@@ -0,0 +1,200 @@
+from typing import Callable, Dict, Tuple, Union
+from math import isqrt
+from .errors import NotPositiveDefiniteError
+from .triangular import invert_lower
+import numpy as np
+import tempfile
+import logging
+
+
+DEFAULT_MEMORY_BUDGET = 2**30   # 1 GB
+
+
+def open_matrix(path: str) -> np.memmap:
+    '''
+        Memory-map the matrix stored in the given file (read only).
+
+        The file can be a .npy file or a raw file of float64 values
+        of a square matrix (written row by row).
+    '''
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+
+    data = np.memmap(path, dtype=np.float64, mode="r")
+    n = isqrt(data.shape[0])
+
+    if n * n != data.shape[0]:
+        raise Exception(f"{path} does not contain a square matrix")
+
+    return data.reshape(n, n)
+
+
+def compute_out_of_core(A: Union[np.ndarray, str], out: Union[np.ndarray, str]=None, block_size=256,
+                        memory_budget=DEFAULT_MEMORY_BUDGET, potrf: Callable=None, 
+                        dtype=np.float64) -> Tuple[np.ndarray, Dict]:
+    '''
+        Left-looking Cholesky factorization for matrices that do not fit in RAM.
+
+        A and L stay on disk (memory-mapped) and only a panel of columns of L
+        is kept in memory: for each panel
+            1. read the panel of A
+            2. subtract the contribution of all the previous panels of L,
+               read from disk block_size columns at a time
+            3. factor the panel by tiles of block_size and write it to L
+
+        All the temporaries are blocks of block_size rows or columns, allocated
+        once, so the RAM used (panel included) stays under memory_budget.
+
+        inputs:
+            A:              matrix to factor (array, np.memmap or path of a .npy/raw file)
+            out:            where to write L (array, np.memmap or path of a .npy file).
+                            If None, L is written to an anonymous temporary file,
+                            deleted when the returned memory map is released
+            block_size:     number of columns of the previous panels read at a time
+                            and size of the tiles of the panel
+            memory_budget:  bytes of RAM that can be used for the panels and the buffers
+                            (ValueError if it cannot hold the buffers and one column)
+            potrf:          function used to factor a diagonal tile
+            dtype:          precision of the panels and of L
+
+        returns:
+            Tuple(
+                L       -> the lower triangular matrix (memory-mapped if out is a path or None)
+                stats   -> Dict with bytes read and written, panel width and number of panels
+            )
+    '''
+    if isinstance(A, str):
+        A = open_matrix(A)
+
+    n, _ = A.shape
+    itemsize = np.dtype(dtype).itemsize
+
+    if potrf is None:
+        potrf = np.linalg.cholesky
+
+    # a fresh file is already filled with zeros,
+    # the upper triangle must be cleared only if out is given by the user
+    clear_upper = not isinstance(out, str) and out is not None
+
+    if out is None:
+        # the file has no name: nothing is left on disk
+        with tempfile.TemporaryFile() as f:
+            out = np.memmap(f, dtype=dtype, mode="w+", shape=(n, n))
+
+    elif isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=(n, n))
+
+    block_size = max(1, min(block_size, n))
+
+    # RAM used, in elements: the panel (n x width), a block of a previous panel
+    # (n x block_size), the product of a block of rows (block_size x width)
+    # and the tiles of the triangular solves
+    elements = memory_budget // itemsize - n * block_size - 3 * block_size * block_size
+    width = int(min(n, elements // (n + block_size))) if n > 0 else 1
+
+    if width < 1:
+        required = (n * block_size + 3 * block_size * block_size + n + block_size) * itemsize
+        raise ValueError(f"memory_budget of {memory_budget} bytes cannot hold the buffers and one column "
+                         f"of a panel ({required} bytes for n={n}, block_size={block_size}): "
+                         f"increase it or reduce block_size")
+
+    if width < block_size and width < n:
+        # every panel reads all the previous columns of L again
+        logging.warning(f"Out of core: panels of only {width} columns (block_size {block_size}), "
+                        f"L will be read {-(-n // width)} times: increase memory_budget")
+
+    # allocated once: the panels of A are read in the rows of buffer
+    buffer = np.empty((width, n), dtype=dtype)
+    previous = np.empty((n, block_size), dtype=dtype)
+    product = np.empty((block_size, width), dtype=dtype)
+
+    stats = {"bytes_read": 0, "bytes_written": 0, "panel_width": width, "panels": 0}
+
+    for k in range(0, n, width):
+        end = min(k + width, n)
+        rows, columns = n - k, end - k
+
+        # by symmetry A[k:, k:end] = A[k:end, k:].T, whose rows are contiguous on disk
+        panel = buffer[:columns, :rows].T
+        panel.T[:] = A[k:end, k:]
+        stats["bytes_read"] += panel.nbytes
+
+        # left-looking update with the previous panels, block_size rows at a time
+        for p in range(0, k, block_size):
+            p_end = min(p + block_size, k)
+
+            block = previous[:rows, :p_end-p]
+            block[:] = out[k:, p:p_end]
+            stats["bytes_read"] += block.nbytes
+
+            for r in range(0, rows, block_size):
+                r_end = min(r + block_size, rows)
+                tmp = product[:r_end-r, :columns]
+
+                np.matmul(block[r:r_end], block[:columns].T, out=tmp)
+                panel[r:r_end] -= tmp
+
+        # factor the panel
+        try:
+            __factor_panel(panel, block_size, potrf, product)
+        except NotPositiveDefiniteError as e:
+            raise NotPositiveDefiniteError(k + e.pivot)
+
+        out[k:, k:end] = panel
+        stats["bytes_written"] += panel.nbytes
+
+        if clear_upper:
+            out[:k, k:end] = 0.0
+            stats["bytes_written"] += k * columns * itemsize
+
+        stats["panels"] += 1
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    logging.info(f"Out of core: {stats['panels']} panels of {width} columns, "
+                 f"read {stats['bytes_read']} bytes, written {stats['bytes_written']} bytes")
+
+    return (out, stats)
+
+
+def __factor_panel(panel: np.ndarray, block_size: int, potrf: Callable, product: np.ndarray):
+    '''
+        Right-looking blocked factorization, in place, of a panel of
+        m rows and w columns (m >= w): the w x w diagonal block becomes L
+        (with the upper triangle set to 0) and the rows below it are solved.
+        Only the diagonal tiles go through potrf.
+    '''
+    rows, columns = panel.shape
+
+    for j in range(0, columns, block_size):
+        j_end = min(j + block_size, columns)
+
+        try:
+            panel[j:j_end, j:j_end] = np.tril(potrf(panel[j:j_end, j:j_end]))
+        except NotPositiveDefiniteError as e:
+            raise NotPositiveDefiniteError(j + e.pivot)
+
+        panel[j:j_end, j_end:] = 0.0    # the upper triangle of L is zero
+
+        # rows below the tile: L_ij L_jj^T = A_ij  ->  L_ij = A_ij L_jj^-T
+        if j_end < rows:
+            inverse = invert_lower(panel[j:j_end, j:j_end])
+
+        for i in range(j_end, rows, block_size):
+            i_end = min(i + block_size, rows)
+            tmp = product[:i_end-i, :j_end-j]
+
+            np.matmul(panel[i:i_end, j:j_end], inverse.T, out=tmp)
+            panel[i:i_end, j:j_end] = tmp
+
+        # trailing columns of the panel, one tile column at a time
+        for c in range(j_end, columns, block_size):
+            c_end = min(c + block_size, columns)
+
+            for r in range(c, rows, block_size):
+                r_end = min(r + block_size, rows)
+                tmp = product[:r_end-r, :c_end-c]
+
+                np.matmul(panel[r:r_end, j:j_end], panel[c:c_end, j:j_end].T, out=tmp)
+                panel[r:r_end, c:c_end] -= tmp
@@ -0,0 +1,73 @@
+import numpy as np
+from math import isqrt
+
+
+# Packed storage of a lower triangular matrix:
+# the rows of L are stored one after the other in a 1-D buffer,
+# keeping only the elements on and below the diagonal.
+#
+#       | l00          |
+#   L = | l10 l11      |   ->  P = [l00, l10, l11, l20, l21, l22]
+#       | l20 l21 l22  |
+#
+# The buffer takes n(n+1)/2 elements instead of n*n.
+
+
+def packed_size(n: int) -> int:
+    '''
+        Number of elements needed to store a nxn lower triangular matrix.
+    '''
+    return n * (n + 1) // 2
+
+
+def packed_index(i: int, j: int) -> int:
+    '''
+        Position of L[i,j] (with j <= i) inside the packed buffer.
+    '''
+    return i * (i + 1) // 2 + j
+
+
+def packed_order(P: np.array) -> int:
+    '''
+        Return n, the size of the matrix stored in the packed buffer P.
+    '''
+    m = P.shape[0]
+    n = (isqrt(8 * m + 1) - 1) // 2
+
+    if packed_size(n) != m:
+        raise Exception(f"{m} is not a valid length for a packed triangular matrix")
+
+    return n
+
+
+def packed_row(P: np.array, i: int) -> np.array:
+    '''
+        Row i of L (only the elements L[i,:i+1]) as a view of the buffer.
+    '''
+    return P[packed_index(i, 0):packed_index(i + 1, 0)]
+
+
+def pack(L: np.ndarray) -> np.array:
+    '''
+        Store the lower triangle of L in a packed buffer.
+    '''
+    n, _ = L.shape
+
+    P = np.empty(packed_size(n), dtype=L.dtype)
+    for i in range(n):
+        packed_row(P, i)[:] = L[i, :i+1]
+
+    return P
+
+
+def unpack(P: np.array) -> np.ndarray:
+    '''
+        Rebuild the full (dense) lower triangular matrix from the packed buffer.
+    '''
+    n = packed_order(P)
+
+    L = np.zeros((n, n), dtype=P.dtype)
+    for i in range(n):
+        L[i, :i+1] = packed_row(P, i)
+
+    return L
@@ -0,0 +1,120 @@
+from typing import Tuple
+from .errors import NotPositiveDefiniteError
+from telemetry import progress
+import numpy as np
+import logging
+
+
+# Factorizations for semidefinite (or nearly singular) matrices, where the
+# plain Cholesky takes the square root of a non positive pivot:
+#
+#   - LDL^T:        A = L D L^T with L unit lower triangular and D diagonal,
+#                   no square roots, a null pivot (with a null column) is kept as d_j = 0
+#   - pivoted:      A[perm][:, perm] = L L^T with L of size n x r, choosing at each
+#                   step the largest remaining diagonal element and stopping when
+#                   it is below the tolerance (numerical rank r): O(n r^2) operations,
+#                   only the diagonal and r columns of A are read
+
+
+def compute_ldlt(A: np.ndarray, tolerance: float=None) -> Tuple[np.ndarray, np.array]:
+    '''
+        Square root free factorization A = L diag(d) L^T (column by column).
+
+        A pivot |d_j| <= tolerance is set to 0 if the rest of its column is
+        also negligible (semidefinite matrix), otherwise NotPositiveDefiniteError
+        is raised (the factorization would need pivoting).
+        The default tolerance is n * eps * max(|a_ii|).
+
+        returns:
+            Tuple(
+                L   -> unit lower triangular matrix
+                d   -> diagonal of D
+            )
+    '''
+    n, _ = A.shape
+
+    if tolerance is None:
+        tolerance = __default_tolerance(A)
+
+    # |s_ij| <= sqrt(s_ii s_jj) for a semidefinite matrix
+    negligible = np.sqrt(tolerance * float(np.max(np.abs(np.diagonal(A)), initial=0.0)))
+
+    L = np.eye(n, dtype=np.float64)
+    d = np.zeros(n, dtype=np.float64)
+
+    for j in progress(range(n), "Cholesky - LDLT"):
+        v = L[j, :j] * d[:j]
+        d[j] = A[j, j] - np.dot(L[j, :j], v)
+        column = A[j+1:, j] - L[j+1:, :j] @ v
+
+        if abs(d[j]) <= tolerance:
+            if np.max(np.abs(column), initial=0.0) > negligible:
+                raise NotPositiveDefiniteError(j)
+
+            d[j] = 0.0
+            continue    # L[j+1:, j] stays 0
+
+        L[j+1:, j] = column / d[j]
+
+    return (L, d)
+
+
+def compute_pivoted(A: np.ndarray, tolerance: float=None, max_rank: int=None) -> Tuple[np.ndarray, np.array, int]:
+    '''
+        Cholesky factorization with diagonal pivoting and early termination:
+
+            A[np.ix_(perm, perm)] ~= L L^T
+
+        At step k the remaining diagonal element d_p that is largest is the pivot:
+        if d_p <= tolerance (or k == max_rank) the factorization stops,
+        the rank is k and L has k columns. The default tolerance is
+        n * eps * max(a_ii), as LAPACK xPSTRF.
+
+        returns:
+            Tuple(
+                L       -> n x rank lower trapezoidal matrix (rows in the order perm)
+                perm    -> the permutation of the rows/columns of A
+                rank    -> numerical rank of A
+            )
+    '''
+    n, _ = A.shape
+
+    if tolerance is None:
+        tolerance = __default_tolerance(A)
+    if max_rank is None:
+        max_rank = n
+
+    perm = np.arange(n)
+    d = np.array(np.diagonal(A), dtype=np.float64)      # diagonal of the remaining Schur complement
+    L = np.zeros((n, min(max_rank, n)), dtype=np.float64)
+
+    rank = 0
+    for k in range(min(max_rank, n)):
+        p = k + np.argmax(d[k:])
+
+        if not d[p] > tolerance:
+            break
+
+        # swap k and p
+        perm[[k, p]] = perm[[p, k]]
+        d[[k, p]] = d[[p, k]]
+        L[[k, p], :k] = L[[p, k], :k]
+
+        pivot = np.sqrt(d[k])
+        L[k, k] = pivot
+
+        # column k of the Schur complement: only the column perm[k] of A is read
+        column = np.asarray(A[perm[k+1:], perm[k]], dtype=np.float64) - L[k+1:, :k] @ L[k, :k]
+        L[k+1:, k] = column / pivot
+
+        d[k+1:] -= L[k+1:, k]**2
+        rank = k + 1
+
+    logging.info(f"Pivoted Cholesky: rank {rank} of {n} (tolerance {tolerance})")
+
+    return (L[:, :rank], perm, rank)
+
+
+def __default_tolerance(A: np.ndarray) -> float:
+    n, _ = A.shape
+    return n * np.finfo(np.float64).eps * float(np.max(np.abs(np.diagonal(A)), initial=0.0))
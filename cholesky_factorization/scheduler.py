@@ -0,0 +1,236 @@
+from collections import defaultdict
+from queue import PriorityQueue
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Tuple
+from .errors import NotPositiveDefiniteError
+from .triangular import invert_lower
+import numpy as np
+import threading
+import logging
+import os
+
+
+# order used to choose between ready tasks of the same step:
+# the tasks on the critical path (POTRF -> TRSM) go first
+__PRIORITY = {"POTRF": 0, "TRSM": 1, "SYRK": 2, "GEMM": 3}
+
+
+def compute_dag(A: np.ndarray, block_size=256, n_workers=None, potrf: Callable=None, 
+                overwrite_a=False) -> Tuple[np.ndarray, List[Dict]]:
+    '''
+        Tiled Cholesky factorization executed as a graph of tasks.
+
+        The matrix is split in tiles of block_size x block_size and the
+        factorization becomes a set of tasks on the tiles:
+
+            POTRF(k)        L_kk = chol(A_kk)
+            TRSM(i,k)       L_ik = A_ik L_kk^-T
+            SYRK(j,k)       A_jj = A_jj - L_jk L_jk^T
+            GEMM(i,j,k)     A_ij = A_ij - L_ik L_jk^T
+
+        Every task is given to a pool of n_workers threads as soon as
+        the tasks it depends on are done, so there is no synchronization
+        between the steps of the factorization.
+
+        inputs:
+            A:          matrix to factor
+            block_size: size of the tiles
+            n_workers:  number of threads (None means all the available cores)
+            potrf:      function used to factor a diagonal tile,
+                        it must return the lower triangular factor
+            overwrite_a: factor in place in A (it must be a floating point array)
+
+        returns:
+            Tuple(
+                L       -> the lower triangular matrix
+                tasks   -> list with the timings of every executed task
+                           (see dag_report)
+            )
+    '''
+    n, _ = A.shape
+    n_tiles = (n + block_size - 1) // block_size
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if potrf is None:
+        potrf = np.linalg.cholesky
+
+    # the factorization overwrites A or a copy of it
+    L = A if overwrite_a else np.array(A, dtype=np.result_type(A, np.float32))
+
+    def tile(i: int, j: int) -> np.ndarray:
+        return L[i*block_size:(i+1)*block_size, j*block_size:(j+1)*block_size]
+
+    inverses = {}   # k -> L_kk^-1, computed once by POTRF for all the TRSM of the column
+
+    def factor(k):
+        try:
+            tile(k, k)[:] = potrf(tile(k, k))
+        except NotPositiveDefiniteError as e:
+            raise NotPositiveDefiniteError(k * block_size + e.pivot)
+
+        if k < n_tiles - 1:
+            inverses[k] = invert_lower(tile(k, k))
+
+    def solve(i, k):
+        tile(i, k)[:] = tile(i, k) @ inverses[k].T
+
+    def update_diagonal(j, k):
+        tile(j, j)[:] -= tile(j, k) @ tile(j, k).T
+
+    def update(i, j, k):
+        tile(i, j)[:] -= tile(i, k) @ tile(j, k).T
+
+    graph, functions = {}, {}
+
+    for k in range(n_tiles):
+        # the updates of the same tile are chained to avoid races
+        graph[("POTRF", k)] = [("SYRK", k, k-1)] if k > 0 else []
+        functions[("POTRF", k)] = (factor, (k,))
+
+        for i in range(k+1, n_tiles):
+            graph[("TRSM", i, k)] = [("POTRF", k)] + ([("GEMM", i, k, k-1)] if k > 0 else [])
+            functions[("TRSM", i, k)] = (solve, (i, k))
+
+        for j in range(k+1, n_tiles):
+            graph[("SYRK", j, k)] = [("TRSM", j, k)] + ([("SYRK", j, k-1)] if k > 0 else [])
+            functions[("SYRK", j, k)] = (update_diagonal, (j, k))
+
+            for i in range(j+1, n_tiles):
+                graph[("GEMM", i, j, k)] = [("TRSM", i, k), ("TRSM", j, k)] + ([("GEMM", i, j, k-1)] if k > 0 else [])
+                functions[("GEMM", i, j, k)] = (update, (i, j, k))
+
+    logging.info(f"Cholesky DAG: {len(graph)} tasks on {n_tiles}x{n_tiles} tiles, {n_workers} workers")
+
+    tasks = __run(graph, functions, n_workers)
+
+    # the upper triangle of L is zero
+    for k in range(n_tiles):
+        L[k*block_size:(k+1)*block_size, (k+1)*block_size:] = 0.0
+
+    return (L, tasks)
+
+
+def dag_report(tasks: List[Dict]) -> Dict:
+    '''
+        Summarize the timings returned by compute_dag (times in ms):
+
+            wall:           duration of the whole factorization
+            busy:           sum of the durations of all the tasks
+            idle:           time the workers spent waiting (workers * wall - busy)
+            critical_path:  duration of the longest chain of dependent tasks
+            by_kind:        total duration of each kind of task
+    '''
+    if not tasks:
+        return {"wall": 0.0, "busy": 0.0, "idle": 0.0, "critical_path": 0.0, "workers": 0, "by_kind": {}}
+
+    start = min(task["start"] for task in tasks)
+    end = max(task["end"] for task in tasks)
+    workers = len({task["worker"] for task in tasks})
+
+    busy = 0
+    by_kind = defaultdict(int)
+    longest = {}
+
+    # a task always starts after its dependencies are done,
+    # so sorting by end time gives a topological order
+    for task in sorted(tasks, key=lambda task: task["end"]):
+        duration = task["end"] - task["start"]
+        busy += duration
+        by_kind[task["kind"]] += duration
+        longest[task["name"]] = duration + max((longest[dep] for dep in task["deps"]), default=0)
+
+    return {
+        "wall": (end - start) / 1e6,
+        "busy": busy / 1e6,
+        "idle": (workers * (end - start) - busy) / 1e6,
+        "critical_path": max(longest.values()) / 1e6,
+        "workers": workers,
+        "by_kind": {kind: duration / 1e6 for kind, duration in by_kind.items()}
+        }
+
+
+def __run(graph: Dict, functions: Dict, n_workers: int) -> List[Dict]:
+    '''
+        Execute the tasks of the graph with n_workers threads.
+        A task is queued as soon as all its dependencies are done.
+    '''
+    remaining = {name: len(deps) for name, deps in graph.items()}
+    dependents = defaultdict(list)
+    for name, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(name)
+
+    queue = PriorityQueue()
+    lock = threading.Lock()
+    records, errors = [], []
+    left = len(graph)
+
+    def push(name):
+        # (step, kind, name): lower steps and critical tasks first
+        queue.put((name[-1], __PRIORITY[name[0]], name))
+
+    def stop():
+        for _ in range(n_workers):
+            queue.put((float("inf"), 0, None))
+
+    def worker():
+        nonlocal left
+
+        while True:
+            _, _, name = queue.get()
+            if name is None:
+                return
+
+            function, args = functions[name]
+            start = perf_counter_ns()
+            try:
+                function(*args)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                stop()
+                return
+            end = perf_counter_ns()
+
+            with lock:
+                records.append({
+                    "name": name,
+                    "kind": name[0],
+                    "deps": graph[name],
+                    "worker": threading.current_thread().name,
+                    "start": start,
+                    "end": end
+                    })
+                left -= 1
+
+                ready = []
+                for dependent in dependents[name]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        ready.append(dependent)
+
+                finished = left == 0
+
+            for dependent in ready:
+                push(dependent)
+
+            if finished:
+                stop()
+
+    for name, count in remaining.items():
+        if count == 0:
+            push(name)
+
+    if left == 0:
+        stop()
+
+    threads = [threading.Thread(target=worker, name=f"cholesky-dag-{i}") for i in range(n_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return records
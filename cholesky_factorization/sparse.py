@@ -0,0 +1,263 @@
+from typing import Dict, Tuple
+from .errors import NotPositiveDefiniteError
+from collections import deque
+from numba import njit
+import numpy as np
+import logging
+import heapq
+
+
+# Sparse Cholesky factorization.
+#
+# The input is a symmetric matrix in CSR (or CSC, that for a symmetric
+# matrix is the same) format with both triangles stored: an object with
+# the indptr, indices, data and shape attributes (like scipy.sparse)
+# or a tuple (indptr, indices, data).
+#
+# The factorization is split in two steps:
+#   - analyze:          fill-reducing ordering and structure of L (symbolic),
+#                       it only depends on the sparsity pattern and can be
+#                       reused by all the matrices with the same pattern
+#   - compute_sparse:   values of L (numeric)
+#
+# L is stored by columns (CSC): the rows of column j are
+# Li[Lp[j]:Lp[j+1]] (the first one is the diagonal) with values Lx.
+
+
+def analyze(A, ordering="minimum_degree") -> Dict:
+    '''
+        Symbolic analysis of the sparsity pattern of A.
+
+        ordering:
+            - minimum_degree:   eliminate first the node with less neighbours
+            - rcm:              reverse Cuthill-McKee (reduces the bandwidth)
+            - natural:          no permutation
+
+        returns a Dict with:
+            n           -> size of the matrix
+            perm        -> the permutation (row i of the permuted matrix is row perm[i] of A)
+            parent      -> elimination tree
+            Lp, Li      -> structure of L (CSC)
+            Rp, Rj      -> structure of L by rows (off-diagonal), used by the numeric step
+            Ap, Ai, map -> structure of the permuted lower triangle of A (CSC)
+                           and position of each value inside A.data
+            nnz_A       -> number of stored values of A (to check the pattern)
+    '''
+    indptr, indices, _, n = __csr(A)
+
+    logging.info(f"Sparse Cholesky: analyzing {n}x{n} with {indices.shape[0]} non zeros ({ordering})")
+
+    perm = orderings[ordering](indptr, indices, n)
+    iperm = np.empty(n, dtype=np.int64)
+    iperm[perm] = np.arange(n)
+
+    # permuted lower triangle, by columns
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    pr, pc = iperm[rows], iperm[indices]
+    lower = np.nonzero(pr >= pc)[0]
+    values = lower[np.lexsort((pr[lower], pc[lower]))]     # positions inside A.data
+
+    Ai = pr[values]
+    Ap = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pc[values], minlength=n), out=Ap[1:])
+
+    # structure of L (elimination tree and rows of each column)
+    parent, columns = __symbolic_columns(Ap, Ai, n)
+
+    counts = np.array([len(column) + 1 for column in columns], dtype=np.int64)
+    Lp = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=Lp[1:])
+
+    Li = np.empty(Lp[n], dtype=np.int64)
+    for j in range(n):
+        Li[Lp[j]] = j
+        Li[Lp[j]+1:Lp[j+1]] = columns[j]
+
+    # structure by rows: the columns k < j with L[j,k] != 0
+    off_diagonal = np.ones(Lp[n], dtype=bool)
+    off_diagonal[Lp[:-1]] = False
+    L_columns = np.repeat(np.arange(n), counts)[off_diagonal]
+    L_rows = Li[off_diagonal]
+
+    Rj = L_columns[np.lexsort((L_columns, L_rows))]
+    Rp = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(L_rows, minlength=n), out=Rp[1:])
+
+    logging.info(f"Sparse Cholesky: L has {Lp[n]} non zeros")
+
+    return {
+        "n": n, "perm": perm, "parent": parent,
+        "Lp": Lp, "Li": Li, "Rp": Rp, "Rj": Rj,
+        "Ap": Ap, "Ai": Ai, "map": values,
+        "nnz_A": indices.shape[0]
+        }
+
+
+def compute_sparse(A, symbolic: Dict=None, ordering="minimum_degree") -> Dict:
+    '''
+        Numeric sparse Cholesky factorization (left-looking).
+        If symbolic is None the pattern of A is analyzed first.
+
+        returns a Dict with the symbolic analysis and the values of L (Lx).
+        Raise NotPositiveDefiniteError if a pivot is not positive
+        (the index refers to the permuted matrix).
+    '''
+    _, _, data, _ = __csr(A)
+
+    if symbolic is None:
+        symbolic = analyze(A, ordering)
+
+    if data.shape[0] != symbolic["nnz_A"]:
+        raise Exception("The matrix does not have the analyzed sparsity pattern")
+
+    Ax = np.asarray(data, dtype=np.float64)[symbolic["map"]]
+    Lx = np.zeros(symbolic["Lp"][-1], dtype=np.float64)
+
+    pivot = __sparse_kernel(
+            symbolic["n"], symbolic["Ap"], symbolic["Ai"], Ax,
+            symbolic["Lp"], symbolic["Li"], symbolic["Rp"], symbolic["Rj"], Lx
+        )
+
+    if pivot >= 0:
+        raise NotPositiveDefiniteError(pivot)
+
+    return {"symbolic": symbolic, "Lx": Lx}
+
+
+# --- ORDERINGS --- #
+
+def __natural(indptr: np.array, indices: np.array, n: int) -> np.array:
+    return np.arange(n)
+
+
+def __minimum_degree(indptr: np.array, indices: np.array, n: int) -> np.array:
+    '''
+        Minimum degree ordering on the elimination graph: the node with less
+        neighbours is eliminated and its neighbours become a clique.
+    '''
+    adjacency = [set(indices[indptr[i]:indptr[i+1]].tolist()) - {i} for i in range(n)]
+    heap = [(len(adjacency[i]), i) for i in range(n)]
+    heapq.heapify(heap)
+
+    eliminated = np.zeros(n, dtype=bool)
+    perm = []
+
+    while heap:
+        degree, v = heapq.heappop(heap)
+        if eliminated[v] or degree != len(adjacency[v]):
+            continue    # old entry of the heap
+
+        eliminated[v] = True
+        perm.append(v)
+
+        neighbours = adjacency[v]
+        for u in neighbours:
+            adjacency[u].discard(v)
+            adjacency[u] |= neighbours - {u}
+            heapq.heappush(heap, (len(adjacency[u]), u))
+
+        adjacency[v] = None
+
+    return np.array(perm, dtype=np.int64)
+
+
+def __rcm(indptr: np.array, indices: np.array, n: int) -> np.array:
+    '''
+        Reverse Cuthill-McKee: breadth first visit starting from a node
+        of minimum degree, visiting the neighbours by increasing degree.
+    '''
+    degree = np.diff(indptr)
+    visited = np.zeros(n, dtype=bool)
+    perm = []
+
+    for start in np.argsort(degree, kind="stable"):
+        if visited[start]:
+            continue
+
+        visited[start] = True
+        queue = deque([start])
+
+        while queue:
+            v = queue.popleft()
+            perm.append(v)
+
+            neighbours = [u for u in indices[indptr[v]:indptr[v+1]] if not visited[u]]
+            for u in sorted(neighbours, key=lambda u: degree[u]):
+                visited[u] = True
+                queue.append(u)
+
+    return np.array(perm[::-1], dtype=np.int64)
+
+
+orderings = {"minimum_degree": __minimum_degree, "rcm": __rcm, "natural": __natural}
+
+
+# --- UTILS --- #
+
+def __csr(A) -> Tuple[np.array, np.array, np.array, int]:
+    if isinstance(A, tuple):
+        indptr, indices, data = A
+    else:
+        indptr, indices, data = A.indptr, A.indices, A.data
+
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+
+    return (indptr, indices, np.asarray(data), indptr.shape[0] - 1)
+
+
+def __symbolic_columns(Ap: np.array, Ai: np.array, n: int):
+    '''
+        Off-diagonal rows of each column of L: the rows of the permuted A
+        and the rows of the children in the elimination tree (without j).
+        The parent of j is the first row below the diagonal.
+    '''
+    parent = np.full(n, -1, dtype=np.int64)
+    children = [[] for _ in range(n)]
+    columns = [None] * n
+
+    for j in range(n):
+        rows = set(Ai[Ap[j]:Ap[j+1]].tolist())
+        for c in children[j]:
+            rows.update(columns[c])
+        rows.discard(j)
+
+        columns[j] = sorted(rows)
+
+        if columns[j]:
+            parent[j] = columns[j][0]
+            children[parent[j]].append(j)
+
+    return (parent, columns)
+
+
+@njit(cache=True)
+def __sparse_kernel(n, Ap, Ai, Ax, Lp, Li, Rp, Rj, Lx) -> int:
+    x = np.zeros(n, dtype=np.float64)      # dense copy of the current column
+    following = Lp[:-1] + 1                 # next entry to use of each column
+
+    for j in range(n):
+        for p in range(Ap[j], Ap[j+1]):
+            x[Ai[p]] = Ax[p]
+
+        # subtract the columns k with L[j,k] != 0
+        for q in range(Rp[j], Rp[j+1]):
+            k = Rj[q]
+            p0 = following[k]
+            l = Lx[p0]
+            for p in range(p0, Lp[k+1]):
+                x[Li[p]] -= Lx[p] * l
+            following[k] = p0 + 1
+
+        if not x[j] > 0.0:
+            return j
+
+        d = np.sqrt(x[j])
+        Lx[Lp[j]] = d
+        x[j] = 0.0
+
+        for p in range(Lp[j] + 1, Lp[j+1]):
+            Lx[p] = x[Li[p]] / d
+            x[Li[p]] = 0.0
+
+    return -1
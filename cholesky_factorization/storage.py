@@ -0,0 +1,151 @@
+from typing import Dict, Tuple
+from .packed import pack, packed_size, packed_order
+from .out_of_core import open_matrix
+import numpy as np
+import hashlib
+import logging
+import json
+import struct
+import os
+
+
+# Binary files of matrices, systems and factors.
+#
+#   - A, b or a dense L:    .npy (np.save), loaded memory-mapped
+#   - A and b together:     .npz (np.savez), loaded in memory
+#   - factor L:             packed lower triangle (see packed.py) after a header
+#
+# Factor file:
+#
+#       | magic (8 bytes) | header length (4 bytes, little endian) | header (JSON) | packed L |
+#
+# the header holds n, dtype, method and checksum of the data, and is padded
+# so that the data starts at a multiple of 64 bytes (aligned for the memory map).
+
+MAGIC = b"CHOLPACK"
+VERSION = 1
+ALIGNMENT = 64
+
+
+def save_matrix(path: str, A: np.ndarray) -> str:
+    '''
+        Save a matrix or a vector (A, b or a dense L) in a .npy file
+        (the suffix is added to path if missing, as np.save does).
+
+        returns the path of the file.
+    '''
+    path = __with_suffix(path, ".npy")
+    np.save(path, A)
+
+    return path
+
+
+def load_matrix(path: str, mmap=True) -> np.ndarray:
+    '''
+        Load a .npy (or raw float64) file, memory-mapped read only (zero copy)
+        if mmap is True. As in save_matrix, ".npy" can be omitted from path.
+    '''
+    if not os.path.exists(path):
+        path = __with_suffix(path, ".npy")
+
+    if mmap:
+        return open_matrix(path)
+
+    return np.load(path)
+
+
+def save_system(path: str, A: np.ndarray, b: np.array) -> str:
+    '''
+        Save the linear system A x = b in a .npz file
+        (the suffix is added to path if missing, as np.savez does).
+
+        returns the path of the file.
+    '''
+    path = __with_suffix(path, ".npz")
+    np.savez(path, A=A, b=b)
+
+    return path
+
+
+def load_system(path: str) -> Tuple[np.ndarray, np.array]:
+    '''
+        Load the linear system saved with save_system (in memory:
+        the arrays of a .npz file cannot be memory-mapped).
+    '''
+    with np.load(__with_suffix(path, ".npz")) as data:
+        return (data["A"], data["b"])
+
+
+def save_factor(path: str, L: np.ndarray, method: str=None):
+    '''
+        Save the factor L (dense or already packed) in packed storage:
+        n(n+1)/2 values instead of n*n, after a header with
+        n, dtype, method and checksum.
+    '''
+    P = np.ascontiguousarray(L if L.ndim == 1 else pack(L))
+    P = P.astype(P.dtype.newbyteorder("<"), copy=False)
+
+    header = {
+        "version": VERSION,
+        "n": packed_order(P),
+        "dtype": P.dtype.str,
+        "method": method,
+        "checksum": __checksum(P)
+        }
+
+    encoded = json.dumps(header).encode()
+    padding = -(len(MAGIC) + 4 + len(encoded)) % ALIGNMENT
+    encoded += b" " * padding
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(P.data)
+
+    logging.info(f"Saved factor {header['n']}x{header['n']} ({header['dtype']}) in {path}")
+
+
+def factor_info(path: str) -> Dict:
+    '''
+        Read the header of a factor file (and the offset of the data).
+    '''
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception(f"{path} is not a factor file")
+
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+
+    if header["version"] > VERSION:
+        raise Exception(f"Unsupported factor file version: {header['version']}")
+
+    header["offset"] = len(MAGIC) + 4 + length
+
+    return header
+
+
+def load_factor(path: str, verify=False) -> np.memmap:
+    '''
+        Memory-map (read only, zero copy) the packed factor saved with save_factor:
+        the processes that load the same file share its pages.
+
+        With verify the checksum is checked (this reads the whole factor).
+    '''
+    header = factor_info(path)
+
+    P = np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r",
+                  offset=header["offset"], shape=(packed_size(header["n"]),))
+
+    if verify and __checksum(P) != header["checksum"]:
+        raise Exception(f"{path} is corrupted: wrong checksum")
+
+    return P
+
+
+def __with_suffix(path: str, suffix: str) -> str:
+    return path if path.endswith(suffix) else path + suffix
+
+
+def __checksum(P: np.array) -> str:
+    return "blake2b:" + hashlib.blake2b(np.ascontiguousarray(P).data, digest_size=16).hexdigest()
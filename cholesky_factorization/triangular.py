@@ -0,0 +1,25 @@
+import numpy as np
+
+
+# Triangular solves of the panels (TRSM) of the tiled factorizations:
+#
+#       L_ik L_kk^T = A_ik      ->      L_ik = A_ik L_kk^-T
+#
+# L_kk is inverted once per step (forward substitution, m^3/3 flops, no LU)
+# and each tile of the panel is then a matrix product with the inverse.
+
+
+def invert_lower(L: np.ndarray) -> np.ndarray:
+    '''
+        Inverse of the lower triangular tile L, by forward substitution
+        on the rows of the identity: row i of X = L^-1 only depends on the
+        rows before it, so each step is one vector-matrix product.
+    '''
+    m, _ = L.shape
+    X = np.zeros_like(L)
+
+    for i in range(m):
+        X[i, :i] = -(L[i, :i] @ X[:i, :i]) / L[i, i]
+        X[i, i] = 1.0 / L[i, i]
+
+    return X
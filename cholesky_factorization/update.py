@@ -0,0 +1,106 @@
+from .errors import NotPositiveDefiniteError
+import numpy as np
+
+
+# Modifications of an existing factorization A = L L^T in O(n^2),
+# without computing the factorization of the new matrix from scratch.
+
+
+def update(L: np.ndarray, v: np.array, overwrite=False) -> np.ndarray:
+    '''
+        Return the factor of A + v v^T, given the factor L of A.
+        If overwrite is True, L is modified in place.
+    '''
+    return __rank_one(L, v, 1.0, overwrite)
+
+
+def downdate(L: np.ndarray, v: np.array, overwrite=False) -> np.ndarray:
+    '''
+        Return the factor of A - v v^T, given the factor L of A.
+        If overwrite is True, L is modified in place.
+
+        Raise NotPositiveDefiniteError if A - v v^T is not positive definite.
+    '''
+    return __rank_one(L, v, -1.0, overwrite)
+
+
+def grow(L: np.ndarray, a: np.array, alpha: float) -> np.ndarray:
+    '''
+        Return the factor of the matrix obtained adding a row and a column to A:
+
+                | A    a     |          | L    0 |
+                | a^T  alpha |   ->     | l^T  d |
+
+        where L l = a  and  d = sqrt(alpha - l^T l).
+    '''
+    n, _ = L.shape
+
+    # forward substitution L l = a
+    l = np.zeros(n, dtype=np.float64)
+    for i in range(n):
+        l[i] = (a[i] - np.dot(L[i, :i], l[:i])) / L[i, i]
+
+    pivot = alpha - np.dot(l, l)
+    if not pivot > 0.0:
+        raise NotPositiveDefiniteError(n)
+
+    G = np.zeros((n + 1, n + 1), dtype=np.float64)
+    G[:n, :n] = L
+    G[n, :n] = l
+    G[n, n] = np.sqrt(pivot)
+
+    return G
+
+
+def shrink(L: np.ndarray, k: int) -> np.ndarray:
+    '''
+        Return the factor of the matrix obtained removing
+        the row and the column k from A.
+
+        The rows after k lose the column k, that is put back
+        with a rank-1 update of the trailing block.
+    '''
+    n, _ = L.shape
+
+    S = np.zeros((n - 1, n - 1), dtype=np.float64)
+    S[:k, :k] = L[:k, :k]
+    S[k:, :k] = L[k+1:, :k]
+    S[k:, k:] = L[k+1:, k+1:]
+
+    __rank_one(S[k:, k:], L[k+1:, k], 1.0, overwrite=True)
+
+    return S
+
+
+def __rank_one(L: np.ndarray, v: np.array, sign: float, overwrite=False) -> np.ndarray:
+    '''
+        Rank-1 update (sign = 1) or downdate (sign = -1) of L,
+        column by column with rotations:
+
+            r = sqrt(L_kk^2 + sign * x_k^2)
+            c = r / L_kk        s = x_k / L_kk
+
+            L[k+1:,k] = (L[k+1:,k] + sign * s * x[k+1:]) / c
+            x[k+1:]   = c * x[k+1:] - s * L[k+1:,k]
+    '''
+    n, _ = L.shape
+
+    if not overwrite:
+        L = np.array(L, dtype=np.float64)
+
+    x = np.array(v, dtype=np.float64)
+
+    for k in range(n):
+        pivot = L[k, k]**2 + sign * x[k]**2
+        if not pivot > 0.0:
+            raise NotPositiveDefiniteError(k)
+
+        r = np.sqrt(pivot)
+        c = r / L[k, k]
+        s = x[k] / L[k, k]
+        L[k, k] = r
+
+        L[k+1:, k] = (L[k+1:, k] + sign * s * x[k+1:]) / c
+        x[k+1:] = c * x[k+1:] - s * L[k+1:, k]
+
+    return L
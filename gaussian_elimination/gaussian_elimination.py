@@ -1,22 +1,58 @@
 import numpy as np
-from tqdm import tqdm
+import logging
 
 
-def compute(Ab: np.ndarray) -> np.ndarray:
+# telemetry.progress is imported inside the functions: when this file is run
+# as a script, the root of the repository is added to sys.path only in __main__
+
+
+def compute(Ab: np.ndarray, method="classic", block_size=64, overwrite=False) -> np.ndarray:
         '''
             Gauss elmination algorithm
 
             inputs:
                 Ab ->   Augmented Matrix, matrix of coefficients with the column 
                         of known terms added.
+                method ->
+                        - classic:      row by row, without pivoting
+                        - vectorized:   each column is eliminated with one outer-product
+                                        update of the whole trailing submatrix (block_size rows
+                                        at a time), with partial pivoting
+                        - blocked:      same as vectorized, block_size columns at a time
+                                        (the trailing submatrix is updated with a matrix product)
+                overwrite ->
+                        (vectorized and blocked) eliminate in place in Ab, that must be
+                        a writeable float array, instead of in a copy.
 
             return:
                 The Upper Triangular matrix obtained by applying the Gaussian
-                elimination to the given matrix Ab.
+                elimination to the given matrix Ab (None if it is singular).
+                With partial pivoting the rows (and the known terms) are swapped,
+                so the system given by the result has the same solution.
             
             N.B.: the returning matrix is not the same as Cholesky, 
                 so the operation UU '= A is not valid !!
         '''
+        if method == "classic":
+            return __compute_classic(Ab)
+
+        if overwrite and Ab.dtype.kind == "f" and Ab.flags.writeable:
+            matrix = Ab
+        else:
+            if overwrite:
+                logging.warning("overwrite needs a writeable float matrix, using a copy")
+            matrix = np.array(Ab, dtype=np.float64)
+
+        if not methods[method](matrix, block_size):
+            logging.error("Gaussian Elimination stopped: the matrix is singular")
+            return None
+
+        return matrix
+
+
+def __compute_classic(Ab: np.ndarray) -> np.ndarray:
+        from telemetry import progress
+
         # make a (true) copy of the array
         # and casts it to float
         matrix = Ab.copy()
@@ -27,7 +63,7 @@ def compute(Ab: np.ndarray) -> np.ndarray:
 
         n,m = matrix.shape
         
-        for i in tqdm(range(0,n), "Gaussian Elimination"):#row
+        for i in progress(range(0,n), "Gaussian Elimination"):#row
             for j in range(i+1,n):
                 if matrix[j,i] != 0.0:
                     matrix[j,i:m]=matrix[j,i:m] - (matrix[j,i]/matrix[i,i])*matrix[i,i:m]
@@ -35,6 +71,104 @@ def compute(Ab: np.ndarray) -> np.ndarray:
         return matrix
 
 
+def __compute_vectorized(matrix: np.ndarray, block_size=64) -> bool:
+    '''
+        Elimination with partial pivoting: for each column k the row with the
+        largest |a_ik| is swapped with row k, then all the rows below are
+        updated with one outer product
+
+            A[k+1:, k:] -= l A[k, k:]       l = A[k+1:, k] / a_kk
+
+        computed block_size rows at a time in a buffer allocated once
+        (a full (n-k) x (m-k) temporary would make each step memory bound).
+
+        Return False if the matrix is singular.
+    '''
+    from telemetry import progress
+
+    n, m = matrix.shape
+    buffer = np.empty((block_size, m), dtype=matrix.dtype)
+
+    for k in progress(range(n), "Gaussian Elimination - VECTORIZED"):
+        if not __pivot(matrix, k):
+            return False
+
+        matrix[k+1:, k] /= matrix[k, k]
+        row = matrix[k, k+1:]
+
+        for r in range(k + 1, n, block_size):
+            r_end = min(r + block_size, n)
+            tmp = buffer[:r_end-r, :m-k-1]
+
+            np.multiply.outer(matrix[r:r_end, k], row, out=tmp)
+            matrix[r:r_end, k+1:] -= tmp
+
+        matrix[k+1:, k] = 0.0
+
+    return True
+
+
+def __compute_blocked(matrix: np.ndarray, block_size=64) -> bool:
+    '''
+        Right-looking blocked elimination with partial pivoting (LU by blocks):
+        for each panel of block_size columns
+            1. eliminate the panel (rows are swapped in the whole matrix),
+               keeping the multipliers L in place of the zeros
+            2. U12 = L11^-1 A12     (rows of the panel, columns on the right)
+            3. A22 -= L21 U12       (one matrix product)
+            4. set the multipliers to zero
+
+        Return False if the matrix is singular.
+    '''
+    from telemetry import progress
+
+    n, _ = matrix.shape
+
+    for k in progress(range(0, n, block_size), "Gaussian Elimination - BLOCKED"):
+        end = min(k + block_size, n)
+
+        # panel
+        for j in range(k, end):
+            if not __pivot(matrix, j):
+                return False
+
+            matrix[j+1:, j] /= matrix[j, j]
+            matrix[j+1:, j+1:end] -= np.outer(matrix[j+1:, j], matrix[j, j+1:end])
+
+        # rows of the panel: forward substitution with the unit lower triangular L11
+        for i in range(k + 1, end):
+            matrix[i, end:] -= matrix[i, k:i] @ matrix[k:i, end:]
+
+        # trailing submatrix
+        matrix[end:, end:] -= matrix[end:, k:end] @ matrix[k:end, end:]
+
+        matrix[k:, k:end] = np.triu(matrix[k:, k:end])
+
+    return True
+
+
+def __pivot(matrix: np.ndarray, k: int) -> bool:
+    '''
+        Partial pivoting: swap row k with the row (below it) with the 
+        largest element in column k. Return False if the column is zero.
+    '''
+    p = k + np.argmax(np.abs(matrix[k:, k]))
+
+    if matrix[p, k] == 0.0:
+        return False
+
+    if p != k:
+        matrix[[k, p]] = matrix[[p, k]]
+
+    return True
+
+
+methods = {
+    "vectorized": __compute_vectorized,
+    "blocked": __compute_blocked
+}
+
+
 def is_correct_solution(A: np.ndarray, G_U: np.ndarray, b: np.array) -> bool:
     '''
         Check that the result of the Gaussian elimination is correct.
@@ -53,13 +187,15 @@ def is_correct_solution(A: np.ndarray, G_U: np.ndarray, b: np.array) -> bool:
         return:
             True, if the solution is correct. False otherwise
     '''
+    from telemetry import progress
+
     n, _ = G_U.shape
     x = np.zeros(n)
 
     # calculates the solution of the system with forward substitution
     x[n-1] = G_U[n-1][n]/G_U[n-1][n-1]
 
-    for i in tqdm(range(n-2,-1,-1), "Checking Gauss Solution"):
+    for i in progress(range(n-2,-1,-1), "Checking Gauss Solution"):
         x[i] = G_U[i][n]
         
         for j in range(i+1,n):
@@ -1 +1,3 @@
-from .linsys_solver import solve, is_correct_solution
\ No newline at end of file
+from .linsys_solver import solve, solve_mixed, solve_ldlt, solve_batched, solve_banded, solve_sparse, is_correct_solution
+from .cache import FactorizationCache
+from .service import SolverService, SolverClient, serve
\ No newline at end of file
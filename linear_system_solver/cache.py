@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+import cholesky_factorization as Cholesky_factorization
+import numpy as np
+import threading
+import hashlib
+import logging
+
+
+class FactorizationCache:
+    '''
+        Cache of Cholesky factorizations, so that the systems with
+        the same matrix A are solved without factoring A again.
+
+        The matrices are identified by a fingerprint (shape, dtype and
+        a hash of the data, or a key given by the user).
+        When the factors take more than max_bytes, the least recently
+        used ones are removed.
+
+        The other arguments are passed to cholesky_factorization.compute.
+    '''
+
+    def __init__(self, max_bytes=2**30, method="blocked", jit=False, nocontrols=False, **options):
+        self.max_bytes = max_bytes
+        self.method = method
+        self.jit = jit
+        self.nocontrols = nocontrols
+        self.options = options
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0       # bytes used by the stored factors
+
+        self.__factors = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(A: np.ndarray, key: Hashable=None) -> Tuple:
+        '''
+            Identify the matrix A: the key, if given, is used in place
+            of the hash of the data (that costs a full read of A).
+        '''
+        if key is None:
+            key = hashlib.blake2b(np.ascontiguousarray(A).data, digest_size=16).hexdigest()
+
+        return (A.shape, A.dtype.str, key)
+
+    def get(self, A: np.ndarray, key: Hashable=None) -> np.ndarray:
+        '''
+            Return the factor L of A, computing it only if it is not in the cache.
+        '''
+        fingerprint = self.fingerprint(A, key)
+
+        with self.__lock:
+            if fingerprint in self.__factors:
+                self.hits += 1
+                self.__factors.move_to_end(fingerprint)
+                return self.__factors[fingerprint]
+
+            self.misses += 1
+
+        logging.info(f"Factorization cache miss: {fingerprint}")
+        L = Cholesky_factorization.compute(A, self.method, self.jit, self.nocontrols, **self.options)
+
+        if L is None:
+            raise Exception("The given matrix cannot be factored")
+
+        self.put(fingerprint, L)
+
+        return L
+
+    def put(self, fingerprint: Tuple, L: np.ndarray):
+        '''
+            Store the factor L and remove the least recently used factors
+            while the cache is over budget.
+        '''
+        with self.__lock:
+            if fingerprint in self.__factors:
+                return
+
+            if L.nbytes > self.max_bytes:
+                logging.info("Factor bigger than the cache, not stored")
+                return
+
+            self.__factors[fingerprint] = L
+            self.size += L.nbytes
+
+            while self.size > self.max_bytes:
+                _, evicted = self.__factors.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__factors.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.__factors),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+            }
+
+    def __len__(self) -> int:
+        return len(self.__factors)
+
+    def __contains__(self, fingerprint: Tuple) -> bool:
+        return fingerprint in self.__factors
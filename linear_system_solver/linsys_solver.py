@@ -1,8 +1,18 @@
+from cholesky_factorization.packed import packed_order, packed_row
+from .cache import FactorizationCache
+import cholesky_factorization as Cholesky_factorization
+from numba import njit, prange
+from typing import Dict, Union
 import numpy as np
-from tqdm import tqdm
+from telemetry import progress
+import logging
 
 
-def solve(L: np.ndarray=None, G_U: np.ndarray=None, b: np.array=None) -> np.array:
+BLOCK_SIZE = 256    # size of the blocks used by the "blocked" backend
+
+
+def solve(L: Union[np.ndarray, str]=None, G_U: np.ndarray=None, b: np.array=None, backend="python",
+          A: np.ndarray=None, cache: FactorizationCache=None, key=None) -> np.array:
     '''
         Solve the given Linear System.
     
@@ -12,18 +22,186 @@ def solve(L: np.ndarray=None, G_U: np.ndarray=None, b: np.array=None) -> np.arra
         
         - if only L and b are given, solve the system starting from 
             the matrix L obtained with the Cholesky factorization
+            (L can also be given in packed storage, as a 1-D array, or as
+            the path of a factor file saved with cholesky_factorization.save_factor,
+            that is memory-mapped)
+
+        - if only A and b are given, A is factored with Cholesky and then
+            the system is solved as before. If a cache is given, the factor
+            is taken from it (key can be used to identify A without hashing it)
         
         - if the parameters do not respect the previous criteria, throw an exception
+
+        b can be a vector or a (n, k) matrix with k right-hand sides:
+        all the systems are solved at the same time and x has the same shape of b
+        (in the same way G_U can be augmented with k columns of known terms).
+
+        backend selects how the triangular systems are solved:
+        - python:       element by element (double loop)
+        - vectorized:   one dot product for each row
+        - blocked:      blocks of rows, updated with matrix-vector products
+        - numba:        compiled substitution loops
+        (a packed L is always solved with the vectorized substitution)
     '''
+    if backend not in backends:
+        raise Exception(f"Unknown backend: {backend}")
+
+    if A is not None and b is not None and L is None and G_U is None:
+        if cache is not None:
+            L = cache.get(A, key)
+        else:
+            L = Cholesky_factorization.compute(A, "blocked")
+
+        if L is None:
+            raise Exception("The given matrix cannot be factored")
+
+        return solve(L=L, b=b, backend=backend)
+
+    if isinstance(L, str):
+        L = Cholesky_factorization.load_factor(L)
+
     if L is not None and b is not None and G_U is None:
-        return __solve_cholesky(L, b)
+        if L.ndim == 1:
+            return __solve_cholesky_packed(L, b)
+
+        if backend == "python":
+            return __solve_cholesky(L, b)
+
+        n, _ = L.shape
+        B = np.asarray(b, dtype=np.float64).reshape(n, -1)  # one column for each system
+
+        # L y = b   and   L^T x = y
+        Y = backends[backend][0](L, B)
+        X = backends[backend][1](L.transpose(), Y)
+
+        return X.reshape(np.shape(b))
 
     if G_U is not None and L is None and b is None:
-        return __solve_gauss(G_U)
+        if backend == "python":
+            return __solve_gauss(G_U)
+
+        n, m = G_U.shape
+        B = np.asarray(G_U[:, n:], dtype=np.float64)
+
+        X = backends[backend][1](G_U[:, :n], B)
+
+        return X[:, 0] if m == n + 1 else X
 
     raise Exception("Wrong Parameters")
 
 
+def solve_mixed(A: np.ndarray, b: np.array, method="blocked", backend="blocked", 
+                max_iterations=10, tolerance=1e-12) -> np.array:
+    '''
+        Mixed precision solver: A is factored in float32 (half the memory,
+        faster factorization) and the solution is brought to float64 accuracy
+        with iterative refinement, using the residuals against the original A:
+
+            x = solve(L, b)
+            repeat:
+                r = b - A x         (float64)
+                x = x + solve(L, r)
+
+        It stops when ||r|| <= tolerance * ||b|| or after max_iterations.
+        If A is too ill-conditioned for float32 the refinement does not converge.
+    '''
+    L = Cholesky_factorization.compute(A, method, validation="fast", dtype=np.float32)
+
+    if L is None:
+        raise Exception("The given matrix cannot be factored")
+
+    b = np.asarray(b, dtype=np.float64)
+    x = solve(L=L, b=b, backend=backend)
+    b_norm = np.linalg.norm(b)
+
+    for iteration in range(max_iterations):
+        r = b - A.dot(x)
+        r_norm = np.linalg.norm(r)
+
+        logging.info(f"Iterative refinement {iteration}: residual {r_norm}")
+        if r_norm <= tolerance * b_norm:
+            return x
+
+        x = x + solve(L=L, b=r, backend=backend)
+
+    logging.warning(f"Iterative refinement did not converge in {max_iterations} iterations")
+
+    return x
+
+
+def solve_ldlt(L: np.ndarray, d: np.array, b: np.array, backend="blocked") -> np.array:
+    '''
+        Solve the system given the factorization A = L diag(d) L^T
+        (see cholesky_factorization.compute_ldlt):
+
+            L y = b,    z = y / d,    L^T x = z
+
+        The components with d_j = 0 (semidefinite A) are set to 0.
+    '''
+    if backend == "python":
+        backend = "vectorized"  # the python backend only solves Cholesky and Gauss
+
+    n, _ = L.shape
+    B = np.asarray(b, dtype=np.float64).reshape(n, -1)
+
+    Y = backends[backend][0](L, B)
+    Z = np.divide(Y, d[:, None], out=np.zeros_like(Y), where=d[:, None] != 0.0)
+    X = backends[backend][1](L.transpose(), Z)
+
+    return X.reshape(np.shape(b))
+
+
+def solve_batched(Ls: np.ndarray, Bs: np.ndarray) -> np.ndarray:
+    '''
+        Solve a stack of linear systems given the stack of their Cholesky
+        factors Ls, with shape (batch, n, n), as returned by 
+        cholesky_factorization.compute_batched.
+
+        Bs has shape (batch, n) or (batch, n, k) and the solutions have 
+        the same shape. The systems are solved in parallel by a compiled kernel.
+    '''
+    Bs = np.asarray(Bs, dtype=np.float64)
+    batch, n = Bs.shape[0], Bs.shape[1]
+
+    Xs = __batched_kernel(np.asarray(Ls, dtype=np.float64), Bs.reshape(batch, n, -1))
+
+    return Xs.reshape(Bs.shape)
+
+
+def solve_banded(LB: np.ndarray, b: np.array) -> np.array:
+    '''
+        Solve the system given the factor in band storage, as returned by
+        cholesky_factorization.compute_banded (O(n w) operations).
+        b can be a vector or a (n, k) matrix.
+    '''
+    n, _ = LB.shape
+    B = np.asarray(b, dtype=np.float64).reshape(n, -1)
+
+    X = __banded_kernel(np.asarray(LB, dtype=np.float64), B)
+
+    return X.reshape(np.shape(b))
+
+
+def solve_sparse(factor: Dict, b: np.array) -> np.array:
+    '''
+        Solve the system given the sparse factor returned by
+        cholesky_factorization.compute_sparse.
+        b can be a vector or a (n, k) matrix.
+    '''
+    symbolic = factor["symbolic"]
+    n, perm = symbolic["n"], symbolic["perm"]
+
+    # the factor is of the permuted matrix P A P^T
+    B = np.asarray(b, dtype=np.float64).reshape(n, -1)[perm]
+
+    Y = __sparse_kernel(symbolic["Lp"], symbolic["Li"], factor["Lx"], B)
+
+    X = np.empty_like(Y)
+    X[perm] = Y
+
+    return X.reshape(np.shape(b))
+
+
 def is_correct_solution(A: np.ndarray, x: np.array, b: np.array) -> bool:
     '''
         Check that the solution x to the given system Ab is correct.
@@ -73,15 +251,15 @@ def __solve_cholesky(L: np.ndarray, b: np.array) -> np.array:
     U = np.transpose(L)
     n, _ = np.shape(L)
 
-    # solution (forword/backword)
-    y = np.zeros(n, dtype=np.float64)   # force cast to float64
-    x = np.zeros(n, dtype=np.float64)
+    # solution (forword/backword), with the same shape of b
+    y = np.zeros(np.shape(b), dtype=np.float64)   # force cast to float64
+    x = np.zeros(np.shape(b), dtype=np.float64)
 
     # TODO: you could add an argument to choose which one
     # method to use.
 
     # Forword sostitution
-    for i in tqdm(range(n), "Solving Cholesky (Forword)"):
+    for i in progress(range(n), "Solving Cholesky (Forword)"):
         sumj = 0                    # TODO: you could write with the
         for j in range(i):          # numpy sum
             sumj += L[i, j] * y[j]
@@ -89,7 +267,7 @@ def __solve_cholesky(L: np.ndarray, b: np.array) -> np.array:
         y[i] = (b[i]-sumj)/L[i, i]
 
     # Backword sostitution
-    for i in tqdm(range(n-1, -1, -1), "Solving Cholesky (Backword)"):
+    for i in progress(range(n-1, -1, -1), "Solving Cholesky (Backword)"):
         sumj = 0                    # TODO: you could write with the
         for j in range(i+1, n):     # numpy sums
             sumj += U[i, j] * x[j]
@@ -100,19 +278,218 @@ def __solve_cholesky(L: np.ndarray, b: np.array) -> np.array:
     # return (x, y)
 
 
+def __solve_cholesky_packed(P: np.array, b: np.array) -> np.array:
+    '''
+        Same as __solve_cholesky, with L given in packed storage 
+        (see cholesky_factorization.packed).
+
+        Only the rows of L are contiguous in the buffer, so the backward
+        substitution is done by columns of U = L^T (that are the rows of L).
+    '''
+    n = packed_order(P)
+
+    y = np.zeros(np.shape(b), dtype=np.float64)
+
+    # Forword sostitution
+    for i in progress(range(n), "Solving Cholesky Packed (Forword)"):
+        row = packed_row(P, i)
+        y[i] = (b[i] - np.dot(row[:i], y[:i])) / row[i]
+
+    # Backword sostitution
+    x = y.copy()
+    for j in progress(range(n-1, -1, -1), "Solving Cholesky Packed (Backword)"):
+        row = packed_row(P, j)
+        x[j] = x[j] / row[j]
+        x[:j] -= np.multiply.outer(row[:j], x[j])   # remove x_j from the remaining equations
+
+    return x
+
+
 def __solve_gauss(G_U: np.ndarray) -> np.array:
-    n, _ = G_U.shape
-    x = np.zeros(n)
+    n, m = G_U.shape
+
+    # known terms (one or more columns)
+    B = G_U[:, n] if m == n + 1 else G_U[:, n:]
+    x = np.zeros(B.shape)
 
     # calculates the solution of the system with forward substitution
-    x[n-1] = G_U[n-1][n]/G_U[n-1][n-1]
+    x[n-1] = B[n-1]/G_U[n-1][n-1]
 
-    for i in tqdm(range(n-2,-1,-1), "Solving Gauss"):
-        x[i] = G_U[i][n]
+    for i in progress(range(n-2,-1,-1), "Solving Gauss"):
+        x[i] = B[i]
         
         for j in range(i+1,n):
             x[i] = x[i] - G_U[i][j]*x[j]
         
         x[i] = x[i]/G_U[i][i]
 
-    return x
\ No newline at end of file
+    return x
+
+
+# --- TRIANGULAR SOLVERS --- #
+# Each backend has a forward substitution for a lower triangular L (L y = b)
+# and a backward substitution for an upper triangular U (U x = y).
+
+## ~~ VECTORIZED
+def __forward_vectorized(L: np.ndarray, b: np.ndarray) -> np.ndarray:
+    n, _ = L.shape
+    y = np.zeros(b.shape, dtype=np.float64)
+
+    for i in progress(range(n), "Solving (Forword)"):
+        y[i] = (b[i] - np.dot(L[i, :i], y[:i])) / L[i, i]
+
+    return y
+
+
+def __backward_vectorized(U: np.ndarray, y: np.ndarray) -> np.ndarray:
+    n, _ = U.shape
+    x = np.zeros(y.shape, dtype=np.float64)
+
+    for i in progress(range(n-1, -1, -1), "Solving (Backword)"):
+        x[i] = (y[i] - np.dot(U[i, i+1:], x[i+1:])) / U[i, i]
+
+    return x
+
+
+## ~~ BLOCKED
+def __forward_blocked(L: np.ndarray, b: np.ndarray) -> np.ndarray:
+    n, _ = L.shape
+    y = np.zeros(b.shape, dtype=np.float64)
+
+    for k in progress(range(0, n, BLOCK_SIZE), "Solving Blocked (Forword)"):
+        end = min(k + BLOCK_SIZE, n)
+
+        # remove the contribution of the solved blocks, then solve the diagonal block
+        # (with many right-hand sides these are matrix-matrix products)
+        rhs = b[k:end] - L[k:end, :k] @ y[:k]
+        y[k:end] = __forward_kernel(np.ascontiguousarray(L[k:end, k:end]), rhs)
+
+    return y
+
+
+def __backward_blocked(U: np.ndarray, y: np.ndarray) -> np.ndarray:
+    n, _ = U.shape
+    x = np.zeros(y.shape, dtype=np.float64)
+
+    for k in progress(range((n - 1) // BLOCK_SIZE * BLOCK_SIZE, -1, -BLOCK_SIZE), "Solving Blocked (Backword)"):
+        end = min(k + BLOCK_SIZE, n)
+
+        rhs = y[k:end] - U[k:end, end:] @ x[end:]
+        x[k:end] = __backward_kernel(np.ascontiguousarray(U[k:end, k:end]), rhs)
+
+    return x
+
+
+## ~~ NUMBA
+# the kernels work on (n, k) matrices of right-hand sides,
+# without the GIL (the solver service runs them in a thread)
+@njit(cache=True, nogil=True)
+def __forward_kernel(L: np.ndarray, b: np.ndarray) -> np.ndarray:
+    n, k = b.shape
+    y = np.zeros((n, k), dtype=np.float64)
+
+    for i in range(n):
+        for c in range(k):
+            y[i, c] = b[i, c]
+
+        for j in range(i):
+            l = L[i, j]
+            for c in range(k):
+                y[i, c] -= l * y[j, c]
+
+        for c in range(k):
+            y[i, c] /= L[i, i]
+
+    return y
+
+
+@njit(cache=True, nogil=True)
+def __backward_kernel(U: np.ndarray, y: np.ndarray) -> np.ndarray:
+    n, k = y.shape
+    x = np.zeros((n, k), dtype=np.float64)
+
+    for i in range(n-1, -1, -1):
+        for c in range(k):
+            x[i, c] = y[i, c]
+
+        for j in range(i+1, n):
+            u = U[i, j]
+            for c in range(k):
+                x[i, c] -= u * x[j, c]
+
+        for c in range(k):
+            x[i, c] /= U[i, i]
+
+    return x
+
+
+## ~~ BATCHED
+@njit(cache=True, parallel=True)
+def __batched_kernel(Ls: np.ndarray, Bs: np.ndarray) -> np.ndarray:
+    Xs = np.empty_like(Bs)
+
+    for b in prange(Ls.shape[0]):
+        # L y = b   and   L^T x = y
+        Xs[b] = __backward_kernel(Ls[b].T, __forward_kernel(Ls[b], Bs[b]))
+
+    return Xs
+
+
+## ~~ BANDED
+@njit(cache=True)
+def __banded_kernel(LB: np.ndarray, b: np.ndarray) -> np.ndarray:
+    n, width = LB.shape
+    k = b.shape[1]
+    x = b.copy()
+
+    # forward: L y = b (column oriented, the band of column j is LB[j])
+    for j in range(n):
+        for c in range(k):
+            x[j, c] /= LB[j, 0]
+        for d in range(1, min(width, n - j)):
+            for c in range(k):
+                x[j + d, c] -= LB[j, d] * x[j, c]
+
+    # backward: L^T x = y (row j of L^T is the band of column j)
+    for j in range(n - 1, -1, -1):
+        for d in range(1, min(width, n - j)):
+            for c in range(k):
+                x[j, c] -= LB[j, d] * x[j + d, c]
+        for c in range(k):
+            x[j, c] /= LB[j, 0]
+
+    return x
+
+
+## ~~ SPARSE
+@njit(cache=True)
+def __sparse_kernel(Lp: np.array, Li: np.array, Lx: np.array, b: np.ndarray) -> np.ndarray:
+    n = Lp.shape[0] - 1
+    k = b.shape[1]
+    x = b.copy()
+
+    # forward: L y = b, by columns
+    for j in range(n):
+        for c in range(k):
+            x[j, c] /= Lx[Lp[j]]
+        for p in range(Lp[j] + 1, Lp[j + 1]):
+            for c in range(k):
+                x[Li[p], c] -= Lx[p] * x[j, c]
+
+    # backward: L^T x = y, column j of L is row j of L^T
+    for j in range(n - 1, -1, -1):
+        for p in range(Lp[j] + 1, Lp[j + 1]):
+            for c in range(k):
+                x[j, c] -= Lx[p] * x[Li[p], c]
+        for c in range(k):
+            x[j, c] /= Lx[Lp[j]]
+
+    return x
+
+
+backends = {
+    "python": None,     # the original implementations (__solve_cholesky, __solve_gauss)
+    "vectorized": (__forward_vectorized, __backward_vectorized), 
+    "blocked": (__forward_blocked, __backward_blocked), 
+    "numba": (__forward_kernel, __backward_kernel)
+    }
@@ -0,0 +1,336 @@
+from collections import deque
+from typing import Any, Dict, List, Tuple
+from .linsys_solver import solve
+import cholesky_factorization as Cholesky_factorization
+import numpy as np
+import asyncio
+import logging
+import socket
+import struct
+import json
+import time
+import os
+
+
+# Resident solver: a process that keeps the factors in memory and answers
+# the solve requests received on a local (Unix) socket.
+#
+# The requests for the same matrix that arrive together (within window seconds)
+# are coalesced: their right-hand sides become the columns of one (n, k) matrix,
+# solved with one multi-RHS triangular solve.
+#
+# Messages (both directions):
+#
+#       | header length (4 bytes) | header (JSON) | arrays (raw bytes) |
+#
+# header["arrays"] lists shape and dtype of the arrays that follow.
+#
+# Operations (header["op"]):
+#       factor  -> key, array A (factored here) or "path" of a factor file / .npy matrix
+#       solve   -> key, array b (vector or (n, k) matrix), returns x
+#       drop    -> key, removes the factor
+#       stats   -> queue depth, latency percentiles, batches
+
+
+class SolverService:
+    '''
+        Asyncio server of the solver: the factors stay in memory and the
+        concurrent requests for the same factor are solved together.
+
+        backend is the one used by solve, method and jit are passed to
+        cholesky_factorization.compute when a matrix is factored.
+    '''
+
+    def __init__(self, path: str, backend="numba", window=0.001, method="blocked", jit=True):
+        self.path = path
+        self.backend = backend
+        self.window = window
+        self.method = method
+        self.jit = jit
+
+        self.factors = {}           # key -> L
+        self.__pending = {}         # (key, id(L)) -> [(b, future)]
+        self.__flushes = set()      # scheduled flush tasks
+        self.__latencies = deque(maxlen=10_000)     # in ms
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.batches = 0
+
+    async def serve(self):
+        '''
+            Listen on the socket until the task is cancelled.
+        '''
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.__warmup()
+
+        server = await asyncio.start_unix_server(self.__handle, path=self.path)
+        logging.info(f"Solver service listening on {self.path}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self.__latencies, dtype=np.float64)
+
+        stats = {
+            "factors": list(self.factors),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0
+            }
+
+        for p in (50, 90, 95, 99):
+            stats[f"latency_p{p}"] = float(np.percentile(latencies, p)) if latencies.size else None
+
+        return stats
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header, arrays = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break   # the client closed the connection
+
+                try:
+                    response, result = await self.__execute(header, arrays)
+                    response["ok"] = True
+                except Exception as e:
+                    logging.error(f"Solver service: {header.get('op')} failed: {e}")
+                    response, result = {"ok": False, "error": str(e)}, []
+
+                writer.write(encode_message(response, result))
+                await writer.drain()
+
+        finally:
+            writer.close()
+
+    async def __execute(self, header: Dict, arrays: List[np.ndarray]) -> Tuple[Dict, List[np.ndarray]]:
+        match header.get("op"):
+            case "solve":
+                start = time.perf_counter()
+                x = await self.__solve(header["key"], arrays[0])
+                self.__latencies.append((time.perf_counter() - start) * 1e3)
+                return ({}, [x])
+
+            case "factor":
+                loop = asyncio.get_running_loop()
+                L = await loop.run_in_executor(None, self.__factor, header, arrays)
+                self.factors[header["key"]] = L
+                return ({"n": L.shape[0]}, [])
+
+            case "drop":
+                self.factors.pop(header["key"], None)
+                return ({}, [])
+
+            case "stats":
+                return (self.stats(), [])
+
+            case op:
+                raise Exception(f"Unknown operation: {op}")
+
+    async def __solve(self, key: str, b: np.array) -> np.array:
+        if key not in self.factors:
+            raise Exception(f"Unknown factor: {key}")
+
+        # the factor is taken now: a drop (or a new factor with the same key)
+        # during the window does not change the batch
+        L = self.factors[key]
+
+        # a wrong right-hand side is rejected here, not with the whole batch
+        if np.ndim(b) not in (1, 2) or np.shape(b)[0] != L.shape[0]:
+            raise Exception(f"Right-hand side of shape {np.shape(b)} for a factor of order {L.shape[0]}")
+
+        future = asyncio.get_running_loop().create_future()
+
+        # the first request of a batch schedules its flush
+        # (the batches are per factor, not per key)
+        batch = (key, id(L))
+        if batch not in self.__pending:
+            self.__pending[batch] = []
+            task = asyncio.get_running_loop().create_task(self.__flush(batch, L))
+            self.__flushes.add(task)    # the loop keeps only a weak reference
+            task.add_done_callback(self.__flushes.discard)
+
+        self.__pending[batch].append((b, future))
+
+        self.requests += 1
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        return await future
+
+    async def __flush(self, key: Tuple[str, int], L: np.ndarray):
+        await asyncio.sleep(self.window)
+
+        batch = self.__pending.pop(key)
+        self.queue_depth -= len(batch)
+        self.batches += 1
+
+        n = L.shape[0]
+
+        try:
+            # each right-hand side becomes one or more columns of B
+            columns = [np.asarray(b, dtype=np.float64).reshape(n, -1) for b, _ in batch]
+            B = np.hstack(columns)
+
+            loop = asyncio.get_running_loop()
+            X = await loop.run_in_executor(None, lambda: solve(L=L, b=B, backend=self.backend))
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():       # cancelled if its client went away
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for (b, future), column in zip(batch, columns):
+            end = start + column.shape[1]
+            if not future.done():
+                future.set_result(X[:, start:end].reshape(np.shape(b)))
+            start = end
+
+    def __factor(self, header: Dict, arrays: List[np.ndarray]) -> np.ndarray:
+        if "path" in header and header["path"].endswith(".npy"):
+            A = Cholesky_factorization.load_matrix(header["path"], mmap=False)
+
+        elif "path" in header:
+            L = Cholesky_factorization.load_factor(header["path"], verify=True)
+            return Cholesky_factorization.unpack(L)    # dense, for the multi-RHS solve
+
+        else:
+            A = arrays[0]
+
+        L = Cholesky_factorization.compute(A, self.method, self.jit)
+        if L is None:
+            raise Exception("The given matrix cannot be factored")
+
+        return L
+
+    def __warmup(self):
+        '''
+            Compile the kernels before the first request.
+        '''
+        A = np.eye(4) * 2.0
+        L = Cholesky_factorization.compute(A, self.method, self.jit)
+        solve(L=L, b=np.ones((4, 2)), backend=self.backend)
+
+
+class SolverClient:
+    '''
+        Blocking client of the SolverService.
+    '''
+
+    def __init__(self, path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+
+    def factor(self, key: str, A: np.ndarray=None, path: str=None) -> int:
+        '''
+            Factor A (or the matrix/factor stored in path) and keep it as key.
+        '''
+        header = {"op": "factor", "key": key}
+        if path is not None:
+            header["path"] = os.path.abspath(path)
+
+        response, _ = self.__request(header, [] if A is None else [A])
+
+        return response["n"]
+
+    def solve(self, key: str, b: np.array) -> np.array:
+        _, arrays = self.__request({"op": "solve", "key": key}, [b])
+        return arrays[0]
+
+    def drop(self, key: str):
+        self.__request({"op": "drop", "key": key}, [])
+
+    def stats(self) -> Dict[str, Any]:
+        response, _ = self.__request({"op": "stats"}, [])
+        return response
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __request(self, header: Dict, arrays: List[np.ndarray]) -> Tuple[Dict, List[np.ndarray]]:
+        self.socket.sendall(encode_message(header, arrays))
+
+        (length,) = struct.unpack("<I", self.__receive(4))
+        response = json.loads(self.__receive(length))
+
+        result = [np.frombuffer(self.__receive(array_nbytes(a)), dtype=a["dtype"]).reshape(a["shape"])
+                  for a in response.pop("arrays")]
+
+        if not response.pop("ok"):
+            raise Exception(f"Solver service: {response['error']}")
+
+        return (response, result)
+
+    def __receive(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise Exception("Solver service: connection closed")
+            data += chunk
+
+        return bytes(data)
+
+
+def serve(path: str, **options):
+    '''
+        Start the solver service on the Unix socket path (blocking).
+    '''
+    try:
+        asyncio.run(SolverService(path, **options).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def encode_message(header: Dict, arrays: List[np.ndarray]) -> bytes:
+    '''
+        Message with the header and the arrays (as float64), see the protocol above.
+    '''
+    arrays = [np.ascontiguousarray(a, dtype=np.float64) for a in arrays]
+    header = dict(header, arrays=[{"shape": a.shape, "dtype": a.dtype.str} for a in arrays])
+
+    encoded = json.dumps(header).encode()
+
+    return b"".join([struct.pack("<I", len(encoded)), encoded] + [a.tobytes() for a in arrays])
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[Dict, List[np.ndarray]]:
+    '''
+        Read a message written by encode_message.
+    '''
+    (length,) = struct.unpack("<I", await reader.readexactly(4))
+    header = json.loads(await reader.readexactly(length))
+
+    arrays = []
+    for a in header.pop("arrays", []):
+        data = await reader.readexactly(array_nbytes(a))
+        arrays.append(np.frombuffer(data, dtype=a["dtype"]).reshape(a["shape"]))
+
+    return (header, arrays)
+
+
+def array_nbytes(array: Dict) -> int:
+    '''
+        Size in bytes of an array described in a header.
+    '''
+    return int(np.prod(array["shape"], dtype=np.int64)) * np.dtype(array["dtype"]).itemsize
@@ -1,6 +1,9 @@
 import utils as Tester
+import linear_system_solver as Linear_system
+import telemetry
 import argparse
 import logging
+import sys
 
 def main(args):
     # settings for logging
@@ -9,29 +12,70 @@ def main(args):
         level=logging.INFO if args.verbose else logging.ERROR
         )
 
+    # progress of the loops
+    match args.progress:
+        case "tqdm":
+            telemetry.add_hook(telemetry.TqdmHook())
+        case "log":
+            logging.getLogger("telemetry").setLevel(logging.INFO)
+            telemetry.add_hook(telemetry.LoggingHook(every=args.progress_every))
+
     # test settings
     Tester.set_algorithm(args.algorithm)
+    Tester.set_data_kind(args.data)
 
     # this only works from python 3.10 onwards
     match args.test_mode:
         case "find_limit":
-            Tester.find_limit(seed=args.seed, method=args.method, jit=args.jit)
+            Tester.find_limit(seed=args.seed, method=args.method, jit=args.jit, memory=args.memory)
 
         case "simple":
             _ = Tester.simple_test(
                     size=args.size, 
                     seed=args.seed, 
                     method=args.method, 
-                    jit=args.jit
+                    jit=args.jit,
+                    factor=args.factor
                 )
         case "benchmark":
             _ = Tester.benchmark(
                     size=args.size,
                     seed=args.seed,
                     method=args.method,
-                    jit=args.jit
+                    jit=args.jit,
+                    warmup=args.warmup,
+                    repeats=args.repeats,
+                    memory=args.memory,
+                    factor=args.factor
+                )
+
+        case "sweep":
+            records = Tester.sweep(
+                    algorithms=args.algorithms or [args.algorithm],
+                    methods=args.methods or [args.method],
+                    jits=[mode == "on" for mode in args.jit_modes] if args.jit_modes else [args.jit],
+                    sizes=args.sizes or [args.size],
+                    seeds=args.seeds or [args.seed],
+                    threads=args.threads or [None],
+                    warmup=args.warmup,
+                    repeats=args.repeats,
+                    results=args.results,
+                    memory=args.memory,
+                    data=args.data,
+                    n_workers=args.workers,
+                    memory_limit=int(args.memory_limit * 2**30) if args.memory_limit is not None else None
                 )
 
+            if args.baseline is not None:
+                comparisons = Tester.compare(records, Tester.load_results(args.baseline), args.threshold)
+                Tester.print_comparison(comparisons)
+
+                if any(c["regression"] for c in comparisons):
+                    return 1
+
+        case "serve":
+            Linear_system.serve(args.socket, backend=args.backend, method=args.method, jit=args.jit)
+
         case _:
             return -1
 
@@ -43,14 +87,19 @@ if __name__ == "__main__":
         "-tm",
         "--test_mode", 
         type=str,
-        choices=["simple", "find_limit", "benchmark"],
+        choices=["simple", "find_limit", "benchmark", "sweep", "serve"],
         default="simple",
         help=
         """Start the selected test mode.
         simple:     generate data, compute factorization/decomposition and resolve the Linear System.
         find_limit: compute different Cholesky Factorization over bigger matrix (size * 2) every time, starting from a 100x100.
         benchmark:  generate data and only compute the factorization/decomposition. 
-                    This returns the execution time and saves results in a file
+                    This returns the execution time statistics (over --repeats runs, after --warmup runs) and saves results in a file
+        sweep:      run the benchmark over the grid given by --algorithms, --methods, --jit_modes, --sizes, --seeds
+                    and --threads (each one defaults to the single value option), append the results to --results
+                    and compare them with --baseline (exit code 1 if there are regressions).
+        serve:      start the solver service on the Unix socket --socket: the factors stay in memory and 
+                    the concurrent solve requests are coalesced (see linear_system_solver.SolverClient).
 
         """
     )
@@ -59,7 +108,7 @@ if __name__ == "__main__":
         "-m",
         "--method", 
         type=str,
-        choices=["row", "column", "diagonal"],
+        choices=["row", "column", "diagonal", "blocked", "dag"],
         default="column",
         help="Select which Cholesky implementation to use."
     )
@@ -84,6 +133,55 @@ if __name__ == "__main__":
         help="Set the matrix size (if possible)."
     )
 
+    parser.add_argument(
+        "--warmup", 
+        type=int,
+        default=1,
+        help="Number of runs (JIT compilation included) discarded by the benchmark."
+    )
+
+    parser.add_argument(
+        "--repeats", 
+        type=int,
+        default=3,
+        help="Number of runs measured by the benchmark."
+    )
+
+    parser.add_argument(
+        "--memory", 
+        action="store_true",
+        help="Profile the memory (peak RSS and allocations) of each phase (benchmark, find_limit and sweep)."
+    )
+
+    parser.add_argument(
+        "--data", 
+        type=str,
+        choices=["product", "diagonally_dominant", "shifted"],
+        default="product",
+        help="How the SPD matrix is generated: A A^T (O(n^3)) or, in O(n^2) and in parallel,\na diagonally dominant matrix or a matrix with n on the diagonal."
+    )
+
+    parser.add_argument(
+        "--factor", 
+        type=str,
+        help="File of the factor L: simple loads it if it exists and has the size of A (otherwise computes and saves it), benchmark saves it."
+    )
+
+    parser.add_argument(
+        "--socket", 
+        type=str,
+        default="/tmp/cholesky_solver.sock",
+        help="(serve) Path of the Unix socket of the solver service."
+    )
+
+    parser.add_argument(
+        "--backend", 
+        type=str,
+        choices=["python", "vectorized", "blocked", "numba"],
+        default="numba",
+        help="(serve) Backend of the triangular solves."
+    )
+
     parser.add_argument(
         "-alg",
         "--algorithm", 
@@ -93,6 +191,60 @@ if __name__ == "__main__":
         help="Choose the algorithm to use."
     )
 
+    parser.add_argument("--algorithms", type=str, nargs="+", choices=["cholesky", "gauss"], help="(sweep) Algorithms to run.")
+    parser.add_argument("--methods", type=str, nargs="+", choices=["row", "column", "diagonal", "blocked", "dag"], help="(sweep) Cholesky methods to run.")
+    parser.add_argument("--jit_modes", type=str, nargs="+", choices=["off", "on"], help="(sweep) Run without and/or with JIT.")
+    parser.add_argument("--sizes", type=int, nargs="+", help="(sweep) Matrix sizes.")
+    parser.add_argument("--seeds", type=int, nargs="+", help="(sweep) Seeds.")
+    parser.add_argument("--threads", type=int, nargs="+", help="(sweep) Number of threads of the parallel factorization.")
+
+    parser.add_argument(
+        "--results", 
+        type=str,
+        default="results.jsonl",
+        help="(sweep) File where the results are appended (.jsonl or .csv)."
+    )
+
+    parser.add_argument(
+        "--workers", 
+        type=int,
+        help="(sweep) Run the configurations in a pool of processes, each one pinned to its own CPUs."
+    )
+
+    parser.add_argument(
+        "--memory_limit", 
+        type=float,
+        help="(sweep) GB that the configurations running in the pool can use together (estimated)."
+    )
+
+    parser.add_argument(
+        "--baseline", 
+        type=str,
+        help="(sweep) Results file to compare with."
+    )
+
+    parser.add_argument(
+        "--threshold", 
+        type=float,
+        default=0.1,
+        help="(sweep) Relative slowdown of the median time that is a regression."
+    )
+
+    parser.add_argument(
+        "--progress", 
+        type=str,
+        choices=["tqdm", "log", "none"],
+        default="tqdm",
+        help="Progress of the loops: tqdm bars, JSON log lines (every --progress_every iterations) or nothing."
+    )
+
+    parser.add_argument(
+        "--progress_every", 
+        type=int,
+        default=100,
+        help="Iterations between two progress log lines (--progress log)."
+    )
+
     parser.add_argument(
         "-v",
         "--verbose", 
@@ -102,4 +254,4 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
 
-    main(args)
+    sys.exit(main(args))
@@ -0,0 +1,2 @@
+from .hooks import Hook, TqdmHook, CallbackHook, LoggingHook
+from .hooks import add_hook, remove_hook, clear_hooks, get_hooks, hooks, progress, phase
\ No newline at end of file
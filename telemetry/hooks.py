@@ -0,0 +1,212 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable
+from time import perf_counter
+import threading
+import logging
+import json
+
+
+# Progress and telemetry of the long loops (factorizations, eliminations, solves).
+#
+# The loops are wrapped in progress(...) and the whole computations in phase(...):
+# the events are sent to the registered hooks. Without hooks progress returns
+# the iterable itself, so nothing is added to the loops.
+#
+# Events (the same for all the hooks):
+#       start       -> the loop/phase name starts (total iterations, None for a phase)
+#       progress    -> done iterations out of total, every hook.every iterations
+#       end         -> the loop/phase ends, with the elapsed time (in seconds)
+
+
+class Hook:
+    '''
+        Base class of the hooks: every method is a no-op.
+    '''
+
+    every = 1   # iterations between two progress events
+
+    def on_start(self, name: str, total: int):
+        pass
+
+    def on_progress(self, name: str, done: int, total: int, elapsed: float):
+        pass
+
+    def on_end(self, name: str, done: int, total: int, elapsed: float):
+        pass
+
+
+class TqdmHook(Hook):
+    '''
+        Progress bar on the terminal (needs tqdm).
+    '''
+
+    def __init__(self, every=1):
+        from tqdm import tqdm   # optional dependency
+
+        self.every = every
+        self.__tqdm = tqdm
+        self.__bars = {}
+
+    def on_start(self, name: str, total: int):
+        if total is not None:
+            self.__bars[name] = self.__tqdm(total=total, desc=name)
+
+    def on_progress(self, name: str, done: int, total: int, elapsed: float):
+        bar = self.__bars.get(name)
+        if bar is not None:
+            bar.update(done - bar.n)
+
+    def on_end(self, name: str, done: int, total: int, elapsed: float):
+        bar = self.__bars.pop(name, None)
+        if bar is not None:
+            bar.update(done - bar.n)
+            bar.close()
+
+
+class CallbackHook(Hook):
+    '''
+        Send each event as a Dict (event, name, done, total, elapsed)
+        to the given function, e.g. the client of a metrics system.
+    '''
+
+    def __init__(self, function: Callable[[Dict], None], every=100):
+        self.function = function
+        self.every = every
+
+    def on_start(self, name: str, total: int):
+        self.function({"event": "start", "name": name, "done": 0, "total": total, "elapsed": 0.0})
+
+    def on_progress(self, name: str, done: int, total: int, elapsed: float):
+        self.function({"event": "progress", "name": name, "done": done, "total": total, "elapsed": elapsed})
+
+    def on_end(self, name: str, done: int, total: int, elapsed: float):
+        self.function({"event": "end", "name": name, "done": done, "total": total, "elapsed": elapsed})
+
+
+class LoggingHook(CallbackHook):
+    '''
+        Write each event as a JSON line with the logging module
+        (the Dict is also passed in the "telemetry" attribute of the record).
+    '''
+
+    def __init__(self, logger: logging.Logger=None, level=logging.INFO, every=100):
+        self.logger = logger if logger is not None else logging.getLogger("telemetry")
+        self.level = level
+
+        super().__init__(self.__log, every)
+
+    def __log(self, event: Dict):
+        self.logger.log(self.level, json.dumps(event), extra={"telemetry": event})
+
+
+__hooks = []
+__lock = threading.Lock()
+
+
+def add_hook(hook: Hook) -> Hook:
+    global __hooks
+
+    with __lock:
+        __hooks = __hooks + [hook]
+
+    return hook
+
+
+def remove_hook(hook: Hook):
+    global __hooks
+
+    with __lock:
+        __hooks = [h for h in __hooks if h is not hook]
+
+
+def clear_hooks():
+    global __hooks
+
+    with __lock:
+        __hooks = []
+
+
+def get_hooks() -> list:
+    return list(__hooks)
+
+
+@contextmanager
+def hooks(*new_hooks: Hook):
+    '''
+        Register the hooks only inside the with block.
+    '''
+    for hook in new_hooks:
+        add_hook(hook)
+
+    try:
+        yield
+
+    finally:
+        for hook in new_hooks:
+            remove_hook(hook)
+
+
+def progress(iterable: Iterable, name: str, total: int=None) -> Iterable:
+    '''
+        Wrap the loop on iterable, sending the progress to the hooks.
+        Without hooks the iterable is returned as it is.
+    '''
+    current = __hooks
+
+    if not current:
+        return iterable
+
+    if total is None:
+        total = len(iterable)
+
+    return __progress(iterable, name, total, current)
+
+
+@contextmanager
+def phase(name: str):
+    '''
+        Send the start and end events of the code inside the with block
+        (e.g. a compiled kernel, where there can be no progress events).
+    '''
+    current = __hooks
+
+    if not current:
+        yield
+        return
+
+    for hook in current:
+        hook.on_start(name, None)
+
+    start = perf_counter()
+
+    try:
+        yield
+
+    finally:
+        elapsed = perf_counter() - start
+        for hook in current:
+            hook.on_end(name, None, None, elapsed)
+
+
+def __progress(iterable: Iterable, name: str, total: int, current: list):
+    for hook in current:
+        hook.on_start(name, total)
+
+    start = perf_counter()
+    done = 0
+
+    try:
+        for item in iterable:
+            # counted when it is given to the loop: a loop that ends
+            # with break still counts its last iteration
+            done += 1
+            yield item
+
+            for hook in current:
+                if done % hook.every == 0:
+                    hook.on_progress(name, done, total, perf_counter() - start)
+
+    finally:
+        elapsed = perf_counter() - start
+        for hook in current:
+            hook.on_end(name, done, total, elapsed)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+import linear_system_solver as Linear_sistem
+
+
+def __spd(n: int, seed=0) -> np.ndarray:
+    M = np.random.default_rng(seed).random((n, n))
+    return M @ M.T + n * np.eye(n)
+
+
+def test_solve_mixed():
+    A = __spd(50)
+    b = np.ones(50)
+
+    x = Linear_sistem.solve_mixed(A, b)
+
+    assert np.allclose(A @ x, b)
+
+
+def test_solve_mixed_not_positive_definite():
+    A = __spd(50)
+    A[10, 10] = -5.0    # still symmetric, no longer positive definite
+
+    with pytest.raises(Exception, match="cannot be factored"):
+        Linear_sistem.solve_mixed(A, np.ones(50))
@@ -0,0 +1,30 @@
+import numpy as np
+import cholesky_factorization as Cholesky_factorization
+from telemetry import CallbackHook, hooks, progress
+
+
+def test_progress_counts_every_item():
+    events = []
+
+    with hooks(CallbackHook(events.append, every=1)):
+        for i in progress(range(4), "loop"):
+            if i == 3:
+                break
+
+    assert events[-1]["event"] == "end"
+    assert events[-1]["done"] == events[-1]["total"] == 4
+
+
+def test_blocked_progress_ends_at_total():
+    M = np.random.default_rng(0).random((100, 100))
+    A = M @ M.T + 100 * np.eye(100)
+    events = []
+
+    with hooks(CallbackHook(events.append, every=1)):
+        L = Cholesky_factorization.compute(A, "blocked", block_size=32)
+
+    assert np.allclose(L @ L.T, A)
+
+    end = [e for e in events if e["event"] == "end" and e["name"] == "Cholesky - BLOCKED"][0]
+    assert end["total"] == 4
+    assert end["done"] == end["total"]
@@ -1,3 +1,7 @@
-from .execution_time import get_execution_time
-from .data_generator import generate_data
-from .tests import find_limit, simple_test, benchmark, set_algorithm
\ No newline at end of file
+from .execution_time import get_execution_time, measure, statistics
+from .data_generator import generate_data, generate_spd, generate_banded_data
+from .tests import find_limit, simple_test, benchmark, set_algorithm, set_data_kind
+from .sweep import sweep, save_results, load_results, compare, print_comparison, machine_metadata
+from .memory import MemoryProfiler, peak_rss, current_rss, reset_peak_rss, format_bytes
+from .performance import flops, bytes_moved, machine_peak, performance
+from .pool import run_pool, factor_many, estimate_memory
\ No newline at end of file
@@ -1,51 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 import numpy as np
 import logging
 
 
-__seed_setted = False
+DEFAULT_BLOCK_SIZE = 1024
 
 
-def __generate_A(size=10, seed=None) -> np.ndarray:
+def __generate_A(size=10, rng: np.random.Generator=None) -> np.ndarray:
     '''
         Genera una matrice Quadrata, Simmetrica e Definita Positiva di dimensione
-        size.
+        size (prodotto A A^T: O(n^3) e due matrici nxn in memoria).
     '''
     logging.info(f"Generating A: {size}x{size}")
 
     # magic ✨
-    A = np.random.rand(size, size)
+    A = rng.random((size, size))
     B = np.dot(A, A.transpose())
 
     return B
 
 
-def __generate_b(size=10, seed=None) -> np.array:
+def __generate_b(size=10, rng: np.random.Generator=None) -> np.array:
     '''
         Genera il vettore dei termini noti
     '''
     
     logging.info(f"Generating b: {size}")
 
-    b = np.random.rand(size)
+    b = rng.random(size)
 
     return b 
 
 
-def generate_data(size=10, seed=None) -> Tuple[np.ndarray, np.array]:
+def generate_data(size=10, seed=None, kind="product") -> Tuple[np.ndarray, np.array]:
     '''
         Ritorna una tupla con i dati del sistema lineare A e b.
+
+        kind:   come viene costruita A
+                    - product:              A A^T (O(n^3))
+                    - diagonally_dominant:  vedi generate_spd (O(n^2), in parallelo)
+                    - shifted:              vedi generate_spd (O(n^2), in parallelo)
+
+        Con lo stesso seed i dati sono sempre gli stessi.
     '''
-    
-    global __seed_setted
+    if kind == "product":
+        rng = np.random.default_rng(seed)
 
-    # se esplicitamente passato, viene settato il seed
-    if seed is not None and not __seed_setted:
-        np.random.seed(seed)
+        A =  __generate_A(size, rng)
+        b = __generate_b(size, rng)
 
-    A =  __generate_A(size, seed)
-    b = __generate_b(size, seed)
+        return (A, b)
+
+    seed_sequence = np.random.SeedSequence(seed)
+
+    A = generate_spd(size, seed_sequence, kind)
+    b = __generate_b(size, __stream(seed_sequence, 0))
+
+    return (A, b)
+
+
+def generate_spd(size=10, seed=None, kind="diagonally_dominant", block_size=DEFAULT_BLOCK_SIZE, 
+                 n_workers=None, out=None) -> np.ndarray:
+    '''
+        Genera una matrice simmetrica e definita positiva in O(n^2),
+        a tile di block_size x block_size riempite in parallelo.
+
+        kind:
+            - diagonally_dominant:  elementi fuori diagonale in [0, 1) e
+                                    a_ii = somma della riga + 1 (Gershgorin)
+            - shifted:              elementi fuori diagonale in [-1, 1) e a_ii = n,
+                                    una sola passata (non servono le somme delle righe)
+
+        Ogni tile ha il suo np.random.Generator, derivato dal seed e dalla 
+        posizione della tile: il risultato dipende solo da seed e block_size,
+        non dal numero di thread (n_workers, None = tutti i core).
+
+        out:    array o path di un file .npy (memory-mapped) dove scrivere A,
+                per le matrici che non entrano in RAM.
+    '''
+    if kind not in ("diagonally_dominant", "shifted"):
+        raise Exception(f"Bad SPD kind: {kind}")
+
+    logging.info(f"Generating SPD A ({kind}): {size}x{size}, tiles {block_size}x{block_size}")
+
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    if isinstance(out, str):
+        A = np.lib.format.open_memmap(out, mode="w+", dtype=np.float64, shape=(size, size))
+    elif out is not None:
+        A = out
+    else:
+        A = np.empty((size, size), dtype=np.float64)
+
+    starts = range(0, size, block_size)
+    tiles = [(i, j) for i in starts for j in starts if j <= i]
+
+    def fill(tile: Tuple[int, int]) -> Tuple[np.array, np.array]:
+        i, j = tile
+        rng = __stream(seed_sequence, 1, i // block_size, j // block_size)
+        rows, columns = min(block_size, size - i), min(block_size, size - j)
+
+        if kind == "shifted":
+            T = rng.uniform(-1.0, 1.0, (rows, columns))
+        else:
+            T = rng.random((rows, columns))
+
+        if i == j:
+            T = np.tril(T, -1)
+            T += T.T
+            if kind == "shifted":
+                T[np.diag_indices(rows)] = size
+
+        A[i:i+rows, j:j+columns] = T
+        if i != j:
+            A[j:j+columns, i:i+rows] = T.T
+
+        if kind == "shifted":
+            return None
+
+        # contributo della tile alle somme delle righe (A è simmetrica)
+        return (T.sum(axis=1), T.sum(axis=0) if i != j else None)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        sums = list(pool.map(fill, tiles))     # nell'ordine delle tile
+
+    if kind == "diagonally_dominant":
+        # le somme sono accumulate sempre nello stesso ordine (riproducibili)
+        row_sums = np.zeros(size, dtype=np.float64)
+        for (i, j), (tile_rows, tile_columns) in zip(tiles, sums):
+            row_sums[i:i+tile_rows.shape[0]] += tile_rows
+            if tile_columns is not None:
+                row_sums[j:j+tile_columns.shape[0]] += tile_columns
+
+        A[np.diag_indices(size)] = row_sums + 1.0
+
+    if isinstance(A, np.memmap):
+        A.flush()
+
+    return A
+
+
+def __stream(seed_sequence: np.random.SeedSequence, *key: int) -> np.random.Generator:
+    '''
+        Generatore indipendente identificato da key (es. la posizione di una tile).
+    '''
+    child = np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + key)
+    return np.random.default_rng(child)
+
+
+def generate_banded_data(size=10, bandwidth=1, seed=None) -> Tuple[np.ndarray, np.array]:
+    '''
+        Ritorna una tupla con i dati di un sistema lineare a banda:
+        A in band storage (vedi cholesky_factorization.banded), simmetrica
+        e definita positiva perché diagonalmente dominante, e b.
+    '''
+    logging.info(f"Generating banded A: {size}x{size}, bandwidth {bandwidth}")
+
+    rng = np.random.default_rng(seed)
+
+    A = np.zeros((size, bandwidth + 1))
+    A[:, 1:] = -rng.random((size, bandwidth))
+
+    # the elements outside the matrix are not used
+    for d in range(1, bandwidth + 1):
+        A[max(size - d, 0):, d] = 0.0
+
+    # diagonal dominance: a_jj > sum of |a_ij| on the row
+    row_sums = np.abs(A[:, 1:]).sum(axis=1)
+    for d in range(1, bandwidth + 1):
+        row_sums[d:] += np.abs(A[:size-d, d])
+    A[:, 0] = row_sums + 1.0
+
+    b = rng.random(size)
 
-    __seed_setted = True    # non setta più il seed in futuro
-    
     return (A, b)
\ No newline at end of file
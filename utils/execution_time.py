@@ -1,33 +1,97 @@
-from time import time
-from typing import Any, Callable, Tuple
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Tuple
 import numpy as np
 
 
-def __get_time(millis=True) -> int:
-    actual_time = round(time())
-    return (actual_time * 1000) if millis else actual_time
+PERCENTILES = (5, 25, 75, 95)
 
 
-def get_execution_time(function: Callable, parameters=[]) -> Tuple[int, Any]:
-    start_time = __get_time() # in millisecondi
+def __get_time() -> int:
+    return perf_counter_ns() # in nanosecondi
+
+
+def get_execution_time(function: Callable, parameters=[]) -> Tuple[float, Any]:
+    '''
+        Execute the function once and return the execution time (in ms) and its result.
+    '''
+    start_time = __get_time()
 
     result = function(*parameters)
 
     end_time = __get_time()
 
-    execution_time = end_time - start_time
+    execution_time = (end_time - start_time) / 1e6 # in millisecondi
 
     return (execution_time, result)
 
 
+def measure(function: Callable, parameters=[], warmup=1, repeats=5) -> Tuple[Dict, Any]:
+    '''
+        Benchmark of a function.
+
+        The warmup runs are executed and discarded (so the JIT compilation
+        of Numba and the first touch of the memory are not measured),
+        then the function is executed repeats times.
+
+        returns:
+            Tuple(
+                stats   -> Dict with the times (in ms) of each run and their statistics
+                result  -> the result of the last run
+            )
+    '''
+    if repeats < 1:
+        raise Exception("At least one repeat is needed")
+
+    warmup_times = []
+    for _ in range(warmup):
+        execution_time, _ = get_execution_time(function, parameters)
+        warmup_times.append(execution_time)
+
+    times = []
+    for _ in range(repeats):
+        execution_time, result = get_execution_time(function, parameters)
+        times.append(execution_time)
+
+    stats = statistics(times)
+    stats["warmup"] = warmup_times
+
+    return (stats, result)
+
+
+def statistics(times: List[float]) -> Dict:
+    '''
+        Median, min, max, mean, standard deviation and percentiles of the times.
+    '''
+    times_array = np.array(times, dtype=np.float64)
+
+    stats = {
+        "times": list(times),
+        "repeats": len(times),
+        "median": float(np.median(times_array)),
+        "min": float(times_array.min()),
+        "max": float(times_array.max()),
+        "mean": float(times_array.mean()),
+        "stddev": float(times_array.std(ddof=1)) if len(times) > 1 else 0.0
+        }
+
+    for p in PERCENTILES:
+        stats[f"p{p}"] = float(np.percentile(times_array, p))
+
+    return stats
+
+
 if __name__ == "__main__":
     from time import sleep
 
     def test(a, b):
         print(f"a: {a}; b: {b}")
-        sleep(10)
+        sleep(0.1)
         return 100
 
     execution_time, result = get_execution_time(test, [1, 2])
 
-    print(execution_time, result)
\ No newline at end of file
+    print(execution_time, result)
+
+    stats, result = measure(test, [1, 2], warmup=1, repeats=5)
+
+    print(stats, result)
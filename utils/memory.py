@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from typing import Dict
+import tracemalloc
+import resource
+import logging
+import sys
+
+
+# Memory used by each phase of a test (data generation, requirement checks,
+# factorization, solve):
+#   - peak RSS:     resident memory of the process (the high water mark is reset
+#                   at the start of each phase where the OS allows it, Linux only)
+#   - tracemalloc:  bytes allocated by Python and NumPy (NumPy reports its
+#                   buffers to tracemalloc), peak during the phase and net change
+#
+# tracemalloc slows down the allocations, so the phases must not be timed
+# while they are profiled.
+
+
+class MemoryProfiler:
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        '''
+            Profile the code executed inside the with block as the phase name.
+        '''
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+
+        reset = reset_peak_rss()
+        tracemalloc.reset_peak()
+        traced_before, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss()
+
+        try:
+            yield
+
+        finally:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+
+            self.phases[name] = {
+                "rss_before": rss_before,
+                "rss_after": current_rss(),
+                "peak_rss": peak_rss(),
+                "peak_rss_reset": reset,    # False: the peak of the whole process until now
+                "traced_peak": traced_peak - traced_before,
+                "traced_net": traced_after - traced_before
+                }
+
+            if started:
+                tracemalloc.stop()
+
+            logging.info(f"Memory ({name}): {self.phases[name]}")
+
+    def results(self) -> Dict[str, Dict]:
+        return self.phases
+
+
+def peak_rss() -> int:
+    '''
+        Peak resident memory of the process (in bytes).
+    '''
+    status = __proc_status()
+    if "VmHWM" in status:
+        return status["VmHWM"]
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024    # KB on Linux
+
+
+def current_rss() -> int:
+    '''
+        Resident memory of the process (in bytes), None if not available.
+    '''
+    return __proc_status().get("VmRSS")
+
+
+def reset_peak_rss() -> bool:
+    '''
+        Reset the peak RSS of the process to the current RSS (Linux only).
+        Return False if it is not possible.
+    '''
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def format_bytes(size: int) -> str:
+    if size is None:
+        return "n.d."
+
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} TB"
+
+
+def __proc_status() -> Dict[str, int]:
+    status = {}
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    status[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+
+    return status
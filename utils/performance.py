@@ -0,0 +1,122 @@
+from typing import Dict
+from time import perf_counter_ns
+import numpy as np
+import logging
+
+
+# Flop rate and memory bandwidth reached by the algorithms, compared with the
+# peak of the machine (roofline model):
+#
+#       attainable GFLOP/s = min(peak GFLOP/s, intensity * peak GB/s)
+#
+# where the arithmetic intensity is flops / bytes moved. The bytes are the
+# compulsory traffic: the input matrix read once and the result written once.
+
+
+__peak = None   # the peak of the machine is measured only once
+
+
+def flops(algorithm: str, n: int) -> float:
+    '''
+        Floating point operations of the algorithm on a nxn matrix
+        (leading term): n^3/3 for Cholesky, 2n^3/3 for Gauss.
+    '''
+    match algorithm:
+        case "cholesky":
+            return n**3 / 3
+        case "gauss":
+            return 2 * n**3 / 3
+        case _:
+            raise Exception("Bad Algorithm Name !")
+
+
+def bytes_moved(algorithm: str, n: int, itemsize=8) -> float:
+    '''
+        Compulsory memory traffic: A (Ab for Gauss) read and L (U) written.
+    '''
+    match algorithm:
+        case "cholesky":
+            return 2 * n * n * itemsize
+        case "gauss":
+            return 2 * n * (n + 1) * itemsize
+        case _:
+            raise Exception("Bad Algorithm Name !")
+
+
+def machine_peak(size=2048, bandwidth_bytes=2**28, repeats=3) -> Dict[str, float]:
+    '''
+        Quick measure of the peak of the machine (best of repeats):
+            gflops      -> GFLOP/s of a size x size matrix product (2 size^3 flops)
+            bandwidth   -> GB/s of the copy of a bandwidth_bytes array (read + write)
+
+        The result is measured once and then reused.
+    '''
+    global __peak
+
+    if __peak is not None:
+        return __peak
+
+    logging.info("Measuring the peak of the machine ...")
+
+    rng = np.random.default_rng(0)
+    A = rng.random((size, size))
+    B = rng.random((size, size))
+    C = np.empty((size, size))
+
+    source = np.ones(bandwidth_bytes // 8)
+    destination = np.empty_like(source)
+
+    matmul_time = __best_time(lambda: np.matmul(A, B, out=C), repeats)
+    copy_time = __best_time(lambda: np.copyto(destination, source), repeats)
+
+    __peak = {
+        "gflops": 2 * size**3 / matmul_time / 1e9,
+        "bandwidth": 2 * source.nbytes / copy_time / 1e9
+        }
+
+    logging.info(f"Peak: {__peak['gflops']:.1f} GFLOP/s, {__peak['bandwidth']:.1f} GB/s")
+
+    return __peak
+
+
+def performance(algorithm: str, n: int, time_ms: float, itemsize=8, peak: Dict[str, float]=None) -> Dict[str, float]:
+    '''
+        Flop rate and bandwidth of an execution of the algorithm
+        that took time_ms, compared with the peak of the machine
+        (the given one, already measured, or machine_peak()).
+    '''
+    if peak is None:
+        peak = machine_peak()
+
+    seconds = time_ms / 1e3
+    operations = flops(algorithm, n)
+    traffic = bytes_moved(algorithm, n, itemsize)
+    intensity = operations / traffic
+
+    gflops = operations / seconds / 1e9
+    attainable = min(peak["gflops"], intensity * peak["bandwidth"])
+
+    return {
+        "flops": operations,
+        "bytes": traffic,
+        "intensity": intensity,                             # flops / byte
+        "gflops": gflops,
+        "bandwidth": traffic / seconds / 1e9,               # GB/s
+        "peak_gflops": peak["gflops"],
+        "peak_bandwidth": peak["bandwidth"],
+        "attainable_gflops": attainable,                    # roofline
+        "efficiency": gflops / attainable                   # fraction of the roofline
+        }
+
+
+def __best_time(function, repeats: int) -> float:
+    function()  # warmup
+
+    best = None
+    for _ in range(repeats):
+        start = perf_counter_ns()
+        function()
+        elapsed = (perf_counter_ns() - start) / 1e9
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
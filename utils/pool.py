@@ -0,0 +1,240 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from collections import deque
+from typing import Dict, List
+from time import perf_counter
+from .sweep import machine_metadata
+from .performance import machine_peak
+import cholesky_factorization as Cholesky_factorization
+import multiprocessing
+import logging
+import json
+import os
+
+
+# Execution of independent tasks (benchmark runs or factorizations) in a pool
+# of processes:
+#   - each worker is pinned to its own set of CPUs, and the BLAS/Numba
+#     threads of the workers are limited to the size of the set
+#   - a task starts only if the estimated memory of the running tasks plus
+#     its own stays under memory_limit (a task bigger than the limit runs alone)
+#   - the results are gathered, in the order of the tasks, into one report
+#
+# Tasks are Dicts:
+#       {"mode": "benchmark", "algorithm": ..., and the arguments of tests.benchmark}
+#       {"mode": "factor", "path": .npy file of A, "out": factor file, "method": ..., "jit": ...}
+
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS")
+
+# matrices of n x n float64 alive at the same time (input, result, temporaries)
+MEMORY_FACTOR = {"cholesky": 3, "gauss": 3, "factor": 2}
+
+
+def run_pool(tasks: List[Dict], n_workers: int=None, memory_limit: int=None, pin=True, report: str=None) -> Dict:
+    '''
+        Execute the tasks in a pool of n_workers processes (None = one for each CPU).
+
+        inputs:
+            memory_limit:   bytes that the running tasks can use together (None = no limit),
+                            estimated with estimate_memory
+            pin:            pin each worker to its own CPUs (Linux only)
+            report:         path of the JSON file where the report is saved
+
+        returns the report: machine metadata, settings, wall time and the
+        result (or the error) of each task.
+    '''
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    n_workers = max(1, min(n_workers or len(cpus), len(tasks) or 1))
+
+    per_worker = max(1, len(cpus) // n_workers)
+    slots = [cpus[(w * per_worker) % len(cpus):][:per_worker] for w in range(n_workers)]
+
+    if pin and not hasattr(os, "sched_setaffinity"):
+        logging.warning("CPU pinning is not available on this platform")
+        pin = False
+
+    logging.info(f"Pool: {len(tasks)} tasks, {n_workers} workers, {per_worker} CPUs each, memory limit {memory_limit}")
+
+    # the workers are new processes (spawn): they start with these variables
+    environment = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+    os.environ.update({name: str(per_worker) for name in THREAD_VARIABLES})
+
+    context = multiprocessing.get_context("spawn")
+
+    results = [None] * len(tasks)
+    pending = deque(enumerate(tasks))
+    running = {}
+    used = 0
+    restarts = 0
+
+    peak = None
+    start = perf_counter()
+
+    try:
+        # the peak is measured once, before the tasks, by a worker with the same
+        # CPUs and threads of the others (and not by each worker while the others
+        # are running): the efficiency of a task is relative to what a worker can reach
+        if any(task.get("mode", "benchmark") == "benchmark" and "peak" not in task for task in tasks):
+            queue = context.Queue()
+            queue.put(slots[0])
+
+            with ProcessPoolExecutor(1, mp_context=context, initializer=__initialize, initargs=(queue, pin)) as probe:
+                peak = probe.submit(machine_peak).result()
+
+            logging.info(f"Pool: peak of a worker {peak['gflops']:.1f} GFLOP/s, {peak['bandwidth']:.1f} GB/s")
+            tasks = [dict(task, peak=peak) if task.get("mode", "benchmark") == "benchmark" else task for task in tasks]
+            pending = deque(enumerate(tasks))
+
+        while pending or running:
+            # a new pool (and new CPU slots) at the start and after a worker died
+            queue = context.Queue()
+            for slot in slots:
+                queue.put(slot)
+
+            with ProcessPoolExecutor(n_workers, mp_context=context, initializer=__initialize, initargs=(queue, pin)) as pool:
+                submitted = 0
+
+                try:
+                    while pending or running:
+                        # admit the tasks in order while they fit in the memory limit
+                        while pending and len(running) < n_workers:
+                            i, task = pending[0]
+                            memory = estimate_memory(task)
+
+                            if running and memory_limit is not None and used + memory > memory_limit:
+                                break
+
+                            running[pool.submit(__run_task, task)] = (i, memory)
+                            pending.popleft()
+                            used += memory
+                            submitted += 1
+
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                        for future in done:
+                            i, memory = running.pop(future)
+                            used -= memory
+
+                            try:
+                                results[i] = future.result()
+                            except Exception as e:
+                                logging.error(f"Pool: task {i} failed: {e!r}")
+                                results[i] = {"task": tasks[i], "error": repr(e)}
+
+                except BrokenProcessPool as e:
+                    # a worker was killed (e.g. out of memory): its task and the
+                    # ones running with it are lost, the pending ones go to a new pool
+                    logging.error(f"Pool: a worker died, {len(running)} running tasks failed, "
+                                  f"{len(pending)} pending tasks restarted")
+
+                    # no task was accepted: the pool cannot start, a new one would not either
+                    lost = list(running.values()) if submitted else list(pending)
+                    if not submitted:
+                        pending.clear()
+
+                    for i, _ in lost:
+                        results[i] = {"task": tasks[i], "error": repr(e)}
+
+                    running.clear()
+                    used = 0
+                    restarts += 1
+
+    finally:
+        for name, value in environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    data = {
+        "machine": machine_metadata(),
+        "n_workers": n_workers,
+        "cpus_per_worker": per_worker,
+        "peak": peak,
+        "pinned": pin,
+        "memory_limit": memory_limit,
+        "restarts": restarts,
+        "wall": perf_counter() - start,     # in s
+        "failures": sum("error" in result for result in results),
+        "tasks": results
+        }
+
+    if report is not None:
+        with open(report, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        logging.info(f"Pool report saved in {report}")
+
+    return data
+
+
+def factor_many(paths: List[str], out_dir: str, method="blocked", jit=True, **options) -> Dict:
+    '''
+        Factor the matrices stored in the .npy files paths, in parallel,
+        saving each factor in out_dir (see cholesky_factorization.save_factor).
+        The other options are passed to run_pool.
+    '''
+    tasks = [{
+        "mode": "factor",
+        "path": path,
+        "out": os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".chol"),
+        "method": method,
+        "jit": jit
+        } for path in paths]
+
+    return run_pool(tasks, **options)
+
+
+def estimate_memory(task: Dict) -> int:
+    '''
+        Bytes used by the task: MEMORY_FACTOR matrices of n x n float64.
+    '''
+    if task.get("mode") == "factor":
+        n, _ = Cholesky_factorization.open_matrix(task["path"]).shape   # only the header is read
+        return MEMORY_FACTOR["factor"] * n * n * 8
+
+    return MEMORY_FACTOR[task.get("algorithm", "cholesky")] * task["size"]**2 * 8
+
+
+def __initialize(queue, pin: bool):
+    slot = queue.get()
+
+    if pin:
+        os.sched_setaffinity(0, slot)
+
+    logging.info(f"Pool worker {os.getpid()}: CPUs {slot}")
+
+
+def __run_task(task: Dict) -> Dict:
+    from . import tests as Tester
+
+    task = dict(task)
+    mode = task.pop("mode", "benchmark")
+    start = perf_counter()
+
+    info = {
+        "pid": os.getpid(),
+        "cpus": sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+        }
+
+    match mode:
+        case "benchmark":
+            Tester.set_algorithm(task.pop("algorithm", "cholesky"))
+            Tester.set_data_kind(task.pop("data", "product"))
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):     # the output of the workers would be mixed
+                result = Tester.benchmark(save=False, **task)
+
+        case "factor":
+            A = Cholesky_factorization.load_matrix(task["path"])
+            L = Cholesky_factorization.compute(A, task["method"], task["jit"])
+
+            if L is None:
+                raise Exception(f"{task['path']} cannot be factored")
+
+            Cholesky_factorization.save_factor(task["out"], L, task["method"])
+            result = {"path": task["path"], "out": task["out"], "n": L.shape[0]}
+
+        case _:
+            raise Exception(f"Unknown task mode: {mode}")
+
+    return {"mode": mode, **result, **info, "wall": perf_counter() - start}
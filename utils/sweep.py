@@ -0,0 +1,271 @@
+from datetime import datetime, timezone
+from itertools import product
+from typing import Dict, Iterable, List
+from . import tests as Tester
+import numpy as np
+import platform
+import logging
+import numba
+import json
+import uuid
+import csv
+import os
+
+
+# Sweep of benchmarks over a grid of configurations.
+#
+# Every run is appended as a flat record (one per configuration) to a single
+# results file, JSONL or CSV depending on the extension, together with the
+# metadata of the machine and of the libraries. A run can be compared with
+# a baseline (a results file of a previous run) to find the regressions.
+
+KEY = ("algorithm", "method", "jit", "size", "seed", "threads")
+STATS = ("median", "min", "max", "mean", "stddev", "p5", "p25", "p75", "p95", "repeats")
+PERFORMANCE = ("gflops", "bandwidth", "efficiency", "peak_gflops", "peak_bandwidth")
+
+
+def machine_metadata() -> Dict:
+    '''
+        Description of the machine and of the libraries used for the benchmarks.
+    '''
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__,
+        "numba_threads": numba.config.NUMBA_NUM_THREADS
+        }
+
+
+def sweep(algorithms=("cholesky",), methods=("column",), jits=(False,), sizes=(1000,), seeds=(20,),
+          threads=(None,), warmup=1, repeats=3, results="results.jsonl", memory=False, 
+          data="product", n_workers=None, memory_limit=None) -> List[Dict]:
+    '''
+        Execute the benchmark of every combination of
+        (algorithm, method, jit, size, seed, threads) and append the results to the results file.
+
+        Gauss does not depend on method, jit and threads, so it is executed once
+        for each (size, seed). With memory, the peak RSS and the peak of the
+        allocations of the factorization are added to the records.
+
+        With n_workers the configurations are executed in a pool of processes
+        pinned to their CPUs, without exceeding memory_limit (see pool.run_pool).
+
+        returns the list of the records of this run.
+    '''
+    run_id = uuid.uuid4().hex
+    metadata = machine_metadata()
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    configs = __grid(algorithms, methods, jits, sizes, seeds, threads)
+    tasks = [{
+        "algorithm": config["algorithm"],
+        "data": data,
+        "size": config["size"],
+        "seed": config["seed"],
+        "method": config["method"] or "column",
+        "jit": bool(config["jit"]),
+        "warmup": warmup,
+        "repeats": repeats,
+        "threads": config["threads"],
+        "memory": memory
+        } for config in configs]
+
+    if n_workers is not None:
+        from .pool import run_pool     # pool imports this module
+
+        report = run_pool(tasks, n_workers=n_workers, memory_limit=memory_limit)
+        outputs = report["tasks"]
+        cpus = report["cpus_per_worker"]
+
+    else:
+        outputs = []
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        for task in tasks:
+            logging.info(f"Sweep: {task}")
+
+            task = dict(task)
+            Tester.set_algorithm(task.pop("algorithm"))
+            Tester.set_data_kind(task.pop("data"))
+            outputs.append(Tester.benchmark(save=False, **task))
+            print()
+
+    records = []
+
+    for config, output in zip(configs, outputs):
+        if "error" in output:
+            continue    # already logged by the pool
+
+        # the CPUs of the benchmark, the peak (and so the efficiency) is measured on them
+        record = {"run_id": run_id, "timestamp": timestamp, **config, "warmup": warmup, "cpus": cpus}
+        record.update({stat: output["stats"][stat] for stat in STATS})
+        record.update({value: output["performance"][value] for value in PERFORMANCE})
+
+        if memory:
+            record["peak_rss"] = output["memory"]["factorization"]["peak_rss"]
+            record["traced_peak"] = output["memory"]["factorization"]["traced_peak"]
+
+        record.update(metadata)
+
+        records.append(record)
+
+    save_results(results, records)
+
+    return records
+
+
+def save_results(path: str, records: List[Dict]):
+    '''
+        Append the records to the results file (.csv or JSONL).
+
+        If the records have columns that are not in the header of an
+        existing CSV file, the file is rewritten with the extended header.
+    '''
+    if not records:
+        return
+
+    if path.endswith(".csv"):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        fields = list(dict.fromkeys(k for record in records for k in record))
+
+        if exists:
+            with open(path, newline="") as f:
+                header = next(csv.reader(f))
+
+            missing = [k for k in fields if k not in header]
+
+            if missing:
+                # a CSV has one header: the file is rewritten with the new columns
+                # (empty in the old records), nothing is dropped
+                logging.warning(f"{path}: new columns {missing}, rewriting the file with them "
+                                f"(JSONL results files do not need this)")
+
+                with open(path, newline="") as f:
+                    old = list(csv.DictReader(f))
+
+                records = old + records
+                exists = False
+
+            fields = header + missing
+
+        with open(path, "a" if exists else "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            if not exists:
+                writer.writeheader()
+            writer.writerows(records)
+
+    else:
+        with open(path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    logging.info(f"Saved {len(records)} results in {path}")
+
+
+def load_results(path: str) -> List[Dict]:
+    '''
+        Read all the records of a results file (.csv or JSONL).
+    '''
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            return [__parse_csv_record(record) for record in csv.DictReader(f)]
+
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(records: List[Dict], baseline: List[Dict], threshold=0.1) -> List[Dict]:
+    '''
+        Compare the median times of the records with the ones of the baseline
+        (for each configuration the most recent baseline record is used,
+        ignoring the records of the same run).
+
+        A configuration is a regression if its median time is more than
+        threshold (relative) slower than the baseline.
+
+        returns the list of the comparisons, with the keys of the configuration,
+        the two medians, the relative change and the regression flag.
+    '''
+    run_ids = {record["run_id"] for record in records}
+
+    reference = {}
+    for record in baseline:
+        if record["run_id"] not in run_ids:
+            reference[__key(record)] = record  # the last one wins
+
+    comparisons = []
+
+    for record in records:
+        old = reference.get(__key(record))
+        if old is None:
+            continue
+
+        change = (record["median"] - old["median"]) / old["median"]
+
+        comparisons.append({
+            **{k: record[k] for k in KEY},
+            "baseline": old["median"],
+            "median": record["median"],
+            "change": change,
+            "regression": change > threshold
+            })
+
+    return comparisons
+
+
+def print_comparison(comparisons: List[Dict]):
+    if not comparisons:
+        print("No configuration in common with the baseline")
+        return
+
+    print(f"{'Algorithm':<10} {'Method':<10} {'JIT':<6} {'Size':>7} {'Seed':>6} {'Threads':>7} "
+          f"{'Baseline (ms)':>14} {'Median (ms)':>12} {'Change':>9}")
+
+    for c in comparisons:
+        print(f"{c['algorithm']:<10} {str(c['method']):<10} {str(c['jit']):<6} {c['size']:>7} {c['seed']:>6} "
+              f"{str(c['threads']):>7} {c['baseline']:>14.3f} {c['median']:>12.3f} {c['change']:>+8.1%}"
+              f"{'  ❌ REGRESSION' if c['regression'] else ''}")
+
+
+def __grid(algorithms: Iterable, methods: Iterable, jits: Iterable, sizes: Iterable,
+           seeds: Iterable, threads: Iterable) -> List[Dict]:
+    configs = []
+
+    for algorithm, size, seed in product(algorithms, sizes, seeds):
+        if algorithm == "gauss":
+            configs.append(dict(zip(KEY, (algorithm, None, None, size, seed, None))))
+            continue
+
+        for method, jit, n_threads in product(methods, jits, threads):
+            configs.append(dict(zip(KEY, (algorithm, method, jit, size, seed, n_threads))))
+
+    return configs
+
+
+def __key(record: Dict) -> tuple:
+    return tuple(record[k] for k in KEY)
+
+
+def __parse_csv_record(record: Dict) -> Dict:
+    '''
+        The values of a CSV file are strings: convert the ones used by compare.
+    '''
+    def value(string: str):
+        if string in ("", "None"):
+            return None
+        if string in ("True", "False"):
+            return string == "True"
+        return string
+
+    record = {k: value(v) for k, v in record.items()}
+
+    for k in ("size", "seed", "threads"):
+        record[k] = int(record[k]) if record[k] is not None else None
+    for k in STATS:
+        record[k] = float(record[k]) if record[k] is not None else None
+
+    return record
@@ -1,8 +1,13 @@
 from asyncio.log import logger
+import os
 import json
-from typing import Any, Callable, Dict, Tuple
-from .execution_time import get_execution_time
+from contextlib import nullcontext
+from functools import partial
+from typing import Callable, Dict, Tuple
+from .execution_time import get_execution_time, measure
 from .data_generator import generate_data
+from .memory import MemoryProfiler, format_bytes
+from .performance import performance
 import cholesky_factorization as Cholesky_factorization
 import gaussian_elimination as Gaussian_elimination
 import linear_system_solver as Linear_sistem
@@ -10,9 +15,10 @@ import numpy as np
 
 
 ALGORITHM = "cholesky"
+DATA_KIND = "product"
 
 
-def simple_test(size=100, seed=20, method="column", jit=False) -> Tuple[np.array, Tuple[int, int]]:
+def simple_test(size=100, seed=20, method="column", jit=False, factor=None) -> Tuple[np.array, Tuple[int, int]]:
     '''
         Risolve un dato Sistema Lineare con la fattorizzazione di Cholesky.
 
@@ -20,6 +26,9 @@ def simple_test(size=100, seed=20, method="column", jit=False) -> Tuple[np.array
             A:          matrice che rappresenta il Sistema
             b:          vettore dei termini noti
             jit:        applica la JIT per migliorare le performance di Cholesky
+            factor:     path del file del fattore L (vedi cholesky_factorization.save_factor):
+                        se esiste L viene caricato (memory-mapped) invece di essere calcolato,
+                        altrimenti L viene calcolato e salvato
 
         returns:
             Tuple(
@@ -41,11 +50,25 @@ def simple_test(size=100, seed=20, method="column", jit=False) -> Tuple[np.array
         # --- Decomposizione della matrice A in LU --- #
         print("CHOLESKY FACTORIZATION ...")
 
-        cholesky_execution_time, L = get_execution_time(Cholesky_factorization.compute, [A, method, jit])
+        # il fattore salvato viene usato solo se è della dimensione di A
+        reuse = factor is not None and os.path.exists(factor) \
+                and Cholesky_factorization.factor_info(factor)["n"] == size
+
+        if factor is not None and os.path.exists(factor) and not reuse:
+            print(f"{factor} is not a {size}x{size} factor, it will be recomputed")
+
+        if reuse:
+            print(f"Loading L from {factor}")
+            cholesky_execution_time, L = get_execution_time(Cholesky_factorization.load_factor, [factor])
+        else:
+            cholesky_execution_time, L = get_execution_time(Cholesky_factorization.compute, [A, method, jit])
         
         if L is None:
-            print("Impossibile scomporre la matrice data !!", force=True)
+            print("Impossibile scomporre la matrice data !!")
             return -1
+
+        if factor is not None and not reuse:
+            Cholesky_factorization.save_factor(factor, L, method)
         
         print(f"L:\n{L}\n")
         print(f"Il risultato è corretto ?: {'✅' if (Cholesky_factorization.is_correct_solution(A, L)) else '❌'}")
@@ -97,7 +120,7 @@ def simple_test(size=100, seed=20, method="column", jit=False) -> Tuple[np.array
         return (x, (gauss_execution_time, linsys_execution_time))
 
 
-    A, b = generate_data(size=size, seed=seed)
+    A, b = generate_data(size=size, seed=seed, kind=DATA_KIND)
 
     match ALGORITHM:
         case "cholesky":
@@ -108,25 +131,72 @@ def simple_test(size=100, seed=20, method="column", jit=False) -> Tuple[np.array
             raise Exception("Bad Algorithm Name !")
 
 
-def find_limit(starting_size=100, seed=20, method="column", jit=False):
+def find_limit(starting_size=100, seed=20, method="column", jit=False, memory=False):
+    '''
+        Il controllo dei requisiti e la fattorizzazione vengono misurati separatamente.
+        Con memory viene misurata anche la memoria usata dalla generazione dei dati,
+        dai controlli e dalla fattorizzazione (N.B.: il tempo è misurato con il profiling attivo).
+    '''
     size = starting_size
     
     while True:
         print(f"SIZE: {size}x{size}")
 
-        A, b = generate_data(size, seed)
+        profiler = MemoryProfiler() if memory else None
 
-        execution_time, _ =  get_execution_time(Cholesky_factorization.compute, [A, method, jit])
+        with __profile(profiler, "generation"):
+            A, b = generate_data(size, seed, DATA_KIND)
+
+        # i controlli dei requisiti sono una fase a parte (come in benchmark)
+        with __profile(profiler, "checks"):
+            checks_time, is_factorizable = get_execution_time(Cholesky_factorization.check_requirements, [A])
+
+        if not is_factorizable:
+            print("Impossibile scomporre la matrice data !!")
+            return
+
+        with __profile(profiler, "factorization"):
+            execution_time, _ =  get_execution_time(Cholesky_factorization.compute, [A, method, jit, True])
         
+        print(f"Checks Execution Time: {checks_time} ms")
         print(f"Cholesky Execution Time: {execution_time} ms")
+        if memory:
+            __print_memory(profiler.results())
         print("\n")
         
         size *= 2
 
 
-def benchmark(size=10_000, seed=20, method="column", jit=False) -> Tuple[int, Any]:  # TODO: controllare cosa ritornare
+def benchmark(size=10_000, seed=20, method="column", jit=False, warmup=1, repeats=3, 
+              threads=None, save=True, memory=False, factor=None, peak=None) -> Dict:
+    '''
+        Misura il tempo di esecuzione della fattorizzazione/decomposizione.
+
+        Le esecuzioni di warmup (compilazione JIT compresa) vengono scartate,
+        poi l'algoritmo viene eseguito repeats volte.
+        Con threads la fattorizzazione di Cholesky viene eseguita in parallelo
+        con il numero di thread indicato. Se save è False i risultati non 
+        vengono salvati su file. Con factor il fattore L dell'ultima esecuzione 
+        viene salvato nel file indicato (vedi cholesky_factorization.save_factor).
+        Con peak si usa il picco della macchina già misurato (vedi machine_peak)
+        invece di misurarlo qui.
+
+        Con memory, dopo le esecuzioni misurate, le fasi (generazione dei dati, 
+        controllo dei requisiti, fattorizzazione e risoluzione del sistema) 
+        vengono eseguite una volta con il profiling della memoria 
+        (picco di RSS e allocazioni di tracemalloc/NumPy), salvato in 'memory'.
+
+        returns:
+            Dict con i tempi (in ms) di ogni esecuzione e le loro statistiche
+            (mediana, min, max, media, deviazione standard e percentili),
+            GFLOP/s e banda di memoria ottenuti (sulla mediana) confrontati
+            con il picco della macchina in 'performance'
+    '''
+    profiler = MemoryProfiler() if memory else None
+
     print("Generating data ...")
-    A, b = generate_data(size, seed)
+    with __profile(profiler, "generation"):
+        A, b = generate_data(size, seed, DATA_KIND)
     print()
 
     match ALGORITHM:
@@ -135,23 +205,46 @@ def benchmark(size=10_000, seed=20, method="column", jit=False) -> Tuple[int, An
             print(f"MATRIX SIZE:\t {size}x{size}")
             print(f"SEED:\t\t {seed}")
             print(f"JIT:\t\t {jit}")
+            print(f"THREADS:\t {threads}")
             print("")
 
-            execution_time, L =  get_execution_time(Cholesky_factorization.compute, [A, method, jit, True])
-            print(f"Execution Time: {execution_time}")
+            compute = partial(Cholesky_factorization.compute, parallel=threads is not None, n_workers=threads)
+            stats, L =  measure(compute, [A, method, jit, True], warmup, repeats)
+            __print_stats(stats)
+            perf = performance(ALGORITHM, size, stats["median"], peak=peak)
+            __print_performance(perf)
 
             data = {
                 #'A': A.tolist(), 
                 #'b': b.tolist(),
                 #'res': L.tolist(),
-                'time': execution_time,
+                'time': stats["median"],
+                'stats': stats,
+                'performance': perf,
                 'algorithm': ALGORITHM, 
                 'size': size, 'seed': seed, 
                 'method': method,
-                'jit': jit
+                'jit': jit,
+                'threads': threads
                 }
 
-            __save(data)
+            if memory:
+                with profiler.phase("checks"):
+                    Cholesky_factorization.check_requirements(A)
+                with profiler.phase("factorization"):
+                    L = compute(A, method, jit, True)
+                with profiler.phase("solve"):
+                    Linear_sistem.solve(L=L, b=b, backend="blocked")
+
+                data['memory'] = profiler.results()
+                __print_memory(data['memory'])
+
+            if factor is not None:
+                Cholesky_factorization.save_factor(factor, L, method)
+                data['factor'] = factor
+
+            if save:
+                __save(data)
 
         case "gauss":
             print(f"ALGORITHM:\t Gauss")
@@ -160,25 +253,42 @@ def benchmark(size=10_000, seed=20, method="column", jit=False) -> Tuple[int, An
             print("")
 
             Ab = np.c_[A, b]    # Augmented Matrix
-            execution_time, U = get_execution_time(Gaussian_elimination.compute, [Ab])
-            print(f"Execution Time: {execution_time}")
+            stats, U = measure(Gaussian_elimination.compute, [Ab], warmup, repeats)
+            __print_stats(stats)
+            perf = performance(ALGORITHM, size, stats["median"], peak=peak)
+            __print_performance(perf)
 
             data = {
                 #'A': A.tolist(), 
                 #'b': b.tolist(),
                 #'res': U.tolist(),
-                'time': execution_time,
+                'time': stats["median"],
+                'stats': stats,
+                'performance': perf,
                 'algorithm': ALGORITHM, 
                 'size': size, 'seed': seed, 
                 'method': None,
                 'jit': None,
+                'threads': None
                 }
 
-            __save(data)
+            if memory:
+                with profiler.phase("factorization"):
+                    U = Gaussian_elimination.compute(Ab)
+                with profiler.phase("solve"):
+                    Linear_sistem.solve(None, U, None)
+
+                data['memory'] = profiler.results()
+                __print_memory(data['memory'])
+
+            if save:
+                __save(data)
 
         case _:
             raise Exception("Bad Algorithm Name !")
 
+    return data
+
 
 def set_algorithm(string: str):
     '''
@@ -191,6 +301,45 @@ def set_algorithm(string: str):
     ALGORITHM = string
 
 
+def set_data_kind(kind: str):
+    '''
+        Cambia il tipo di matrice generata (vedi data_generator.generate_data)
+
+            product/diagonally_dominant/shifted
+    '''
+    global DATA_KIND
+
+    DATA_KIND = kind
+
+
+def __print_stats(stats: Dict):
+    print(f"Execution Time (ms) over {stats['repeats']} runs "
+          f"(+{len(stats['warmup'])} warmup: {', '.join(f'{t:.3f}' for t in stats['warmup'])})")
+    print(f"  median: {stats['median']:.3f}\t min: {stats['min']:.3f}\t max: {stats['max']:.3f}")
+    print(f"  mean:   {stats['mean']:.3f}\t stddev: {stats['stddev']:.3f}")
+    print(f"  p5: {stats['p5']:.3f}\t p25: {stats['p25']:.3f}\t p75: {stats['p75']:.3f}\t p95: {stats['p95']:.3f}")
+
+
+def __print_performance(perf: Dict):
+    print(f"Performance: {perf['gflops']:.3f} GFLOP/s ({perf['efficiency']:.1%} of the roofline: "
+          f"{perf['attainable_gflops']:.1f} GFLOP/s)\t bandwidth: {perf['bandwidth']:.3f} GB/s")
+    print(f"  machine peak: {perf['peak_gflops']:.1f} GFLOP/s, {perf['peak_bandwidth']:.1f} GB/s"
+          f"\t intensity: {perf['intensity']:.1f} flop/byte")
+
+
+def __print_memory(phases: Dict):
+    print("Memory:")
+    for name, phase in phases.items():
+        print(f"  {name:<14} peak RSS: {format_bytes(phase['peak_rss'])}"
+              f"{'' if phase['peak_rss_reset'] else ' (process)'}\t"
+              f" allocated (peak): {format_bytes(phase['traced_peak'])}\t"
+              f" allocated (net): {format_bytes(phase['traced_net'])}")
+
+
+def __profile(profiler: MemoryProfiler, name: str):
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+
 def __save(data: Dict):
     logger.info("Saving Data")
     with open(f"{data['algorithm']}_{data['method']}_{data['size']}_{data['seed']}.json", "w") as f: